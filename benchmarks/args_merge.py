@@ -0,0 +1,80 @@
+"""
+Benchmark `Args.merge` (`Args + Args`) against the previous row-wise implementation.
+
+    python benchmarks/args_merge.py [rows ...]
+
+Two forecast snapshots of `rows` hourly records each, overlapping by half, are merged.
+The previous implementation gave every row of a snapshot the same `timestamp` string (the
+repr of whole Series). So no rows matched, the outer merge just stacked both snapshots, and
+the row-wise `apply` then ran over all of them. It is only timed up to `LEGACY_MAX_ROWS`.
+"""
+import sys
+import time
+from datetime import time as dtime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from groupby_db import Args, GroupBy  # noqa: E402
+
+LEGACY_MAX_ROWS = 10_000
+
+
+def snapshot(rows, offset=0, seed=0):
+    rng = np.random.default_rng(seed)
+    idx = np.arange(offset, offset + rows)
+    days = pd.Timestamp('2023-01-01') + pd.to_timedelta((idx // 24) % 365, unit='D')
+    return Args.from_frame(pd.DataFrame({
+        'location_name': [f'Location {i // 8760}' for i in idx],
+        'day': days.strftime('%m/%d/%Y'),
+        'hour': [dtime(i % 24) for i in idx],
+        'min_temp_fah': rng.uniform(20, 60, rows),
+        'max_temp_fah': rng.uniform(60, 100, rows),
+        'temp_fah': rng.uniform(20, 100, rows),
+        'humidity': rng.integers(0, 100, rows),
+        'condition': rng.choice(['Clear Sky', 'Light Rain', 'Overcast Clouds'], rows),
+    }))
+
+
+def legacy_add(self, other, on_='timestamp', how_='outer'):
+    data = self.frame.copy()
+    other_data = other.frame.copy()
+
+    data['hour'] = data['hour'].astype(str)
+    other_data['hour'] = other_data['hour'].astype(str)
+
+    data['timestamp'] = f"{data['location_name']} {data['day']} {data['hour']}"
+    other_data['timestamp'] = f"{other_data['location_name']} {other_data['day']} {other_data['hour']}"
+
+    merged_data = pd.merge(data, other_data, on=on_, how=how_)
+    merged_data.drop(columns=on_, inplace=True)
+
+    for col in self.arg2:
+        x_col = f"{col}_x"
+        y_col = f"{col}_y"
+        if x_col in merged_data.columns and y_col in merged_data.columns:
+            merged_data[col] = merged_data.apply(lambda row: row[y_col] if pd.notna(row[y_col]) else row[x_col], axis=1)
+            merged_data.drop(columns=[x_col, y_col], inplace=True)
+    return GroupBy._reset(merged_data)
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, len(result.frame)
+
+
+def main(sizes):
+    print(f"{'rows':>8} {'legacy (s)':>12} {'legacy rows':>12} {'merge (s)':>10} {'merge rows':>11}")
+    for rows in sizes:
+        old, new = snapshot(rows), snapshot(rows, offset=rows // 2, seed=1)
+        legacy = timed(legacy_add, old, new) if rows <= LEGACY_MAX_ROWS else (float('nan'), '-')
+        merged = timed(Args.merge, old, new)
+        print(f'{rows:>8} {legacy[0]:>12.3f} {legacy[1]:>12} {merged[0]:>10.4f} {merged[1]:>11}')
+
+
+if __name__ == '__main__':
+    main([int(i) for i in sys.argv[1:]] or [250, 1_000, 10_000, 100_000])
@@ -0,0 +1,37 @@
+"""
+Compare the hyperparameter search strategies of `WeatherManager` on stored locations.
+
+    python benchmarks/search_strategies.py [location ...]
+
+Each location is trained once per strategy in `SEARCH_STRATEGIES` on the same split.
+The wall time and the held-out scores are printed. Defaults to the first stored location.
+"""
+import sys
+import warnings
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from forecast_predictive import SEARCH_STRATEGIES, train_location  # noqa: E402
+from groupby_db import DBConnect  # noqa: E402
+
+
+def main(locations):
+    data = DBConnect().database.frame
+    locations = locations or [data['location_name'].iloc[0]]
+    print(f"{'location':<32} {'search':>8} {'time (s)':>9} {'temp MSE':>9} {'temp R2':>8} {'cond acc':>9}")
+    for location in locations:
+        frame = data[data['location_name'] == location]
+        if frame.empty:
+            print(f"Error: No stored data for '{location}'")
+            continue
+        for search in SEARCH_STRATEGIES:
+            result, _ = train_location(location, frame, search=search)
+            print(f'{location[:32]:<32} {search:>8} {result.seconds:>9.1f} {result.mse_temp:>9.3f} '
+                  f'{result.r2_temp:>8.3f} {result.accuracy_cond * 100:>8.2f}%')
+
+
+if __name__ == '__main__':
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", category=UserWarning)
+        main(sys.argv[1:])
@@ -0,0 +1,79 @@
+"""
+Measure the import and first-report time of the weather_data CLI.
+
+    python benchmarks/startup.py [place]
+
+Two fresh interpreters are started with `-X importtime`. The first only imports
+`weather_data`. The second also prints a simple report for `place` (default 'New York'),
+which needs valid API keys in config.json and network access. For each run the script
+prints the wall time, the cumulative import time of `weather_data`, the heavy optional
+dependencies that were loaded, and the slowest direct imports.
+"""
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+HEAVY = ('numpy', 'pandas', 'bs4', 'rapidfuzz', 'psycopg', 'psycopg_pool')
+
+IMPORT_ONLY = 'import weather_data'
+FIRST_REPORT = 'import weather_data; weather_data.SimpleWeather({place!r}).display_weather_report()'
+LOADED = '; import sys; print("loaded:", *sorted({{i for i in {heavy!r} if i in sys.modules}}), file=sys.stderr)'
+
+
+def parse_importtime(stderr):
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative_us, name = line.split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        imports.append((depth, name.strip(), int(cumulative_us)))
+    return imports
+
+
+def direct_imports(imports, module='weather_data'):
+    """
+    The modules imported by `module` itself. `-X importtime` lists children before their parent.
+    """
+    children = []
+    for depth, name, us in imports:
+        if depth == 0:
+            if name == module:
+                return children
+            children = []
+        elif depth == 1:
+            children.append((name, us))
+    return []
+
+
+def run(code):
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code + LOADED.format(heavy=HEAVY)],
+                            cwd=ROOT, capture_output=True, text=True)
+    return time.perf_counter() - start, result
+
+
+def report(label, code, top=8):
+    wall, result = run(code)
+    imports = parse_importtime(result.stderr)
+    total = next((us for _, name, us in imports if name == 'weather_data'), 0)
+    loaded = next((line for line in result.stderr.splitlines() if line.startswith('loaded:')), 'loaded:')
+    print(f'\n{label}: {wall * 1000:.0f} ms wall, weather_data imported in {total / 1000:.0f} ms')
+    print(f'  heavy dependencies {loaded}')
+    for name, us in sorted(direct_imports(imports), key=lambda i: -i[1])[:top]:
+        print(f'  {us / 1000:>8.1f} ms  {name}')
+    #**The CLI reports failures with an 'Error:' line and a zero exit status
+    errors = [line for line in result.stdout.splitlines() if line.startswith('Error:')]
+    if result.returncode or errors:
+        print(f"  {errors[0] if errors else 'Error: ' + result.stderr.strip().splitlines()[-1]}")
+
+
+def main(place):
+    report('import weather_data', IMPORT_ONLY)
+    report(f'first report for {place!r}', FIRST_REPORT.format(place=place))
+
+
+if __name__ == '__main__':
+    main(' '.join(sys.argv[1:]) or 'New York')
@@ -1,99 +1,241 @@
+import os
+import time
 import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import NamedTuple
 
-import pandas as pd
+from sklearn.base import clone
 from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
 from sklearn.metrics import accuracy_score, mean_squared_error, r2_score
-from sklearn.model_selection import GridSearchCV, train_test_split
+from sklearn.model_selection import (GridSearchCV, HalvingGridSearchCV, ParameterGrid,
+                                     RandomizedSearchCV, train_test_split)
 from sklearn.preprocessing import LabelEncoder, StandardScaler
 
-from groupby_db import DBConnect, GroupBy
+from groupby_db import DBConnect
+from model_registry import LocationModels, ModelRegistry
+from weather_features import frame_features
+
+
+class TrainingResult(NamedTuple):
+    location: str
+    mse_temp: float
+    r2_temp: float
+    accuracy_cond: float
+    search: str = 'grid'
+    seconds: float = 0.0
+
+    @property
+    def metrics(self):
+        return {'mse_temp': self.mse_temp, 'r2_temp': self.r2_temp, 'accuracy_cond': self.accuracy_cond,
+                'search': self.search, 'seconds': self.seconds}
+
+
+PARAM_GRID = {
+    'n_estimators': [100, 200, 300],
+    'max_depth': [None, 5, 10, 15],
+    'min_samples_split': [2, 5, 10]
+}
+SEARCH_STRATEGIES = ('grid', 'halving', 'random', 'warm')
+
+
+def warm_start_search(model, X, y, n_jobs=-1):
+    """
+    Pick forest parameters by out-of-bag score, growing each forest with `warm_start`.
+
+    For every `max_depth` and `min_samples_split` pair, one forest is grown through the
+    `n_estimators` steps of `PARAM_GRID`. Each step only adds the missing trees, and the
+    out-of-bag samples stand in for cross-validation. The best parameters are refit once.
+
+    Returns:
+        - `tuple`: The refitted best estimator and its out-of-bag score.
+    """
+    best_score, best_params = None, None
+    grid = {key: value for key, value in PARAM_GRID.items() if key != 'n_estimators'}
+    for params in ParameterGrid(grid):
+        forest = clone(model).set_params(warm_start=True, oob_score=True, n_jobs=n_jobs, **params)
+        for n_estimators in PARAM_GRID['n_estimators']:
+            forest.set_params(n_estimators=n_estimators).fit(X, y)
+            if best_score is None or forest.oob_score_ > best_score:
+                best_score, best_params = forest.oob_score_, {**params, 'n_estimators': n_estimators}
+    return clone(model).set_params(n_jobs=n_jobs, **best_params).fit(X, y), best_score
+
+
+def search_model(model, X, y, search='grid', n_jobs=-1, n_iter=10):
+    """
+    Tune a forest over `PARAM_GRID` with the chosen search strategy.
+
+    Parameters:
+        - `model` (RandomForestRegressor | RandomForestClassifier): The unfitted forest.
+        - `X`, `y`: The training features and target.
+        - `search` (str): One of `SEARCH_STRATEGIES`:
+            - `'grid'`: Every combination, 5-fold cross-validated.
+            - `'halving'`: Successive halving, with trees as the resource (25, 75, then 225).
+            - `'random'`: `n_iter` random combinations, 5-fold cross-validated.
+            - `'warm'`: Warm-started forests scored out-of-bag, see `warm_start_search`.
+        - `n_jobs` (int): CPUs the search may use. Defaults to -1 (all).
+        - `n_iter` (int): Combinations tried by the `'random'` search. Defaults to 10.
+
+    Returns:
+        - `tuple`: The best estimator and its validation score.
+    """
+    match search:
+        case 'grid':
+            searcher = GridSearchCV(model, param_grid=PARAM_GRID, cv=5, n_jobs=n_jobs)
+        case 'halving':
+            grid = {key: value for key, value in PARAM_GRID.items() if key != 'n_estimators'}
+            searcher = HalvingGridSearchCV(model, param_grid=grid, cv=5, factor=3, resource='n_estimators',
+                                           min_resources=25, max_resources=max(PARAM_GRID['n_estimators']),
+                                           random_state=42, n_jobs=n_jobs)
+        case 'random':
+            searcher = RandomizedSearchCV(model, param_distributions=PARAM_GRID, n_iter=n_iter, cv=5,
+                                          random_state=42, n_jobs=n_jobs)
+        case 'warm':
+            return warm_start_search(model, X, y, n_jobs=n_jobs)
+        case _:
+            raise ValueError(f"Unknown search strategy '{search}', expected one of {SEARCH_STRATEGIES}")
+    searcher.fit(X, y)
+    return searcher.best_estimator_, searcher.best_score_
+
+
+def train_location(location, data, n_jobs=-1, search='grid', n_iter=10):
+    """
+    Train and evaluate the temperature and condition models of one location.
+
+    This is a module-level function so it can run in a worker process.
+
+    Parameters:
+        - `location` (str): The location name.
+        - `data` (pd.DataFrame): The location's rows of the reporting query.
+        - `n_jobs` (int): CPUs each search may use. Defaults to -1 (all).
+        - `search` (str): The hyperparameter search strategy, see `search_model`. Defaults to 'grid'.
+        - `n_iter` (int): Combinations tried by the 'random' search. Defaults to 10.
+
+    Returns:
+        - `tuple`: The `TrainingResult` metrics and the fitted `LocationModels`.
+    """
+    warnings.filterwarnings("ignore", category=UserWarning)
+    start = time.perf_counter()
+    data = data.rename(columns=str.strip)
+    label_encoder = LabelEncoder()
+    #**Features are built once and shared by both models
+    X = frame_features(data)
+    Y_temp = data['temp_fah'].to_numpy()
+    Y_cond = label_encoder.fit_transform(data['condition'])
+
+    X_train, X_test, y_temp_train, y_temp_test, y_cond_train, y_cond_test = train_test_split(
+        X, Y_temp, Y_cond, test_size=0.2, random_state=42)
+
+    scaler = StandardScaler()
+    X_temp_train_scaled = scaler.fit_transform(X_train)
+    X_temp_test_scaled = scaler.transform(X_test)
+
+    regression_model = RandomForestRegressor(random_state=42)
+    best_regression_model, _ = search_model(regression_model, X_temp_train_scaled, y_temp_train,
+                                            search=search, n_jobs=n_jobs, n_iter=n_iter)
+
+    y_temp_pred = best_regression_model.predict(X_temp_test_scaled)
+    mse_temp = mean_squared_error(y_temp_test, y_temp_pred)
+    r2_temp = r2_score(y_temp_test, y_temp_pred)
+
+    classification_model = RandomForestClassifier(random_state=42)
+    best_classification_model, _ = search_model(classification_model, X_train, y_cond_train,
+                                                search=search, n_jobs=n_jobs, n_iter=n_iter)
+
+    y_cond_pred = best_classification_model.predict(X_test)
+    accuracy_cond = accuracy_score(y_cond_test, y_cond_pred)
+    models = LocationModels(best_regression_model, best_classification_model, scaler, label_encoder)
+    seconds = time.perf_counter() - start
+    return TrainingResult(location, mse_temp, r2_temp, accuracy_cond, search, seconds), models
 
 
 class WeatherManager:
-    def __init__(self, database):
+    def __init__(self, database, cpu_budget=None, max_workers=None, registry=None, retrain=False,
+                 search='grid', n_iter=10):
+        """
+        Train the models of every stored location whose data changed since the last run.
+
+        Parameters:
+            - `database` (DBConnect): The database to train from.
+            - `cpu_budget` (int, optional): Total CPUs shared by all training. Defaults to `os.cpu_count()`.
+            - `max_workers` (int, optional): Maximum locations trained at once. Defaults to `cpu_budget`.
+            - `registry` (ModelRegistry, optional): Where fitted models are saved. Defaults to `models/`.
+            - `retrain` (bool): Retrain every location, even if its data is unchanged. Defaults to False.
+            - `search` (str): The hyperparameter search strategy, see `search_model`. Defaults to 'grid'.
+            - `n_iter` (int): Combinations tried by the 'random' search. Defaults to 10.
+        """
+        if search not in SEARCH_STRATEGIES:
+            print(f"Error: Unknown search strategy '{search}', expected one of {SEARCH_STRATEGIES}")
+            raise SystemExit
         self.database = database
+        self.cpu_budget = cpu_budget or os.cpu_count() or 1
+        self.max_workers = max_workers or self.cpu_budget
+        self.registry = registry or ModelRegistry()
+        self.retrain = retrain
+        self.search = search
+        self.n_iter = n_iter
         self.get_tables()
 
-    def fix_time(self, time_str):
-        h, m, s = map(int, time_str.split(':'))
-        return h * 3600 + m * 60 + s
-    
+    def get_frames(self):
+        """
+        Fetch every location with one query and split the rows by location.
+
+        Returns:
+            - `dict`: Maps each location name to its DataFrame.
+        """
+        data = self.database.database.frame
+        return {location: frame for location, frame in data.groupby('location_name', sort=False)}
+
+    def needs_training(self, location, fingerprint):
+        #**Locations whose data and search strategy are unchanged keep their saved models
+        if self.retrain or not self.registry.is_current(location, fingerprint):
+            return True
+        return self.registry.index[location].get('metrics', {}).get('search', 'grid') != self.search
+
     def get_tables(self):
-        num_locations = len(self.database.get_locations)
-        for i in range(1, num_locations):
-            df = pd.DataFrame(loc(i).arg1, columns=loc(i).arg2)
-            self.regression_model_(df)
-    
+        """
+        Train all locations in a process pool within `cpu_budget` CPUs.
+
+        Workers times the search `n_jobs` never exceeds the budget, so the outer
+        pool and the inner searches do not oversubscribe the machine.
+        """
+        frames = self.get_frames()
+        fingerprints = {location: self.registry.fingerprint(frame) for location, frame in frames.items()}
+        frames = {location: frame for location, frame in frames.items()
+                  if self.needs_training(location, fingerprints[location])}
+        if len(frames) < len(fingerprints):
+            print(f'{len(fingerprints) - len(frames)} location(s) unchanged, skipping retraining.')
+        if not frames:
+            return
+        workers = max(1, min(len(frames), self.max_workers, self.cpu_budget))
+        n_jobs = max(1, self.cpu_budget // workers)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(train_location, location, frame, n_jobs, self.search, self.n_iter)
+                       for location, frame in frames.items()]
+            for future in as_completed(futures):
+                result, models = future.result()
+                self.registry.save(result.location, fingerprints[result.location], models, metrics=result.metrics)
+                self.print_results(result)
+
     def regression_model_(self, data):
-        location = reset(data).arg1[0][0]
-        data.columns = data.columns.str.strip()
-        data['hour'] = data['hour'].apply(lambda t: t.strftime('%H:%M:%S'))
-        data['hour'] = data['hour'].apply(lambda i: self.fix_time(i))
-        data['day'] = pd.to_datetime(data['day'], format='%m/%d/%Y')
-        data['day'] = data['day'].astype(int) / 10**9
-        label_encoder = LabelEncoder()
-        data['condition_encoded'] = label_encoder.fit_transform(data['condition'])
-
-        temp_features = ['humidity', 'hour', 'day']
-        temp_target = 'temp_fah'
-
-        cond_features = ['humidity', 'hour', 'day']
-        cond_target = 'condition_encoded'
-
-        X_temp = data[temp_features]
-        Y_temp = data[temp_target]
-
-        X_cond = data[cond_features]
-        Y_cond = data[cond_target]
-        
-        X_temp_train, X_temp_test, y_temp_train, y_temp_test = train_test_split(X_temp, Y_temp, test_size=0.2, random_state=42)
-        X_cond_train, X_cond_test, y_cond_train, y_cond_test = train_test_split(X_cond, Y_cond, test_size=0.2, random_state=42)
-        
-        
-        scaler = StandardScaler()
-        X_temp_train_scaled = scaler.fit_transform(X_temp_train)
-        X_temp_test_scaled = scaler.transform(X_temp_test)
-        param_grid_regression = {
-            'n_estimators': [100, 200, 300],
-            'max_depth': [None, 5, 10, 15],
-            'min_samples_split': [2, 5, 10]
-        }
-        
-        regression_model = RandomForestRegressor(random_state=42)
-        grid_search_regression = GridSearchCV(regression_model, param_grid=param_grid_regression, cv=5, n_jobs=-1)
-        grid_search_regression.fit(X_temp_train_scaled, y_temp_train)
-        best_regression_model = grid_search_regression.best_estimator_
-
-        y_temp_pred = best_regression_model.predict(X_temp_test_scaled)
-        mse_temp = mean_squared_error(y_temp_test, y_temp_pred)
-        r2_temp = r2_score(y_temp_test, y_temp_pred)
-        
-        param_grid_classification = {
-            'n_estimators': [100, 200, 300],
-            'max_depth': [None, 5, 10, 15],
-            'min_samples_split': [2, 5, 10]
-        }
-        classification_model = RandomForestClassifier(random_state=42)
-        grid_search_classification = GridSearchCV(classification_model,param_grid=param_grid_classification, cv=5, n_jobs=-1)
-        grid_search_classification.fit(X_cond_train, y_cond_train)
-        best_classification_model = grid_search_classification.best_estimator_
-
-        y_cond_pred = best_classification_model.predict(X_cond_test)
-        accuracy_cond = accuracy_score(y_cond_test, y_cond_pred)
-        
-        print(f'\nResults for {location}:')
-        print(f'\tTemperature Regression Mean Squared Error: {mse_temp:.3f}')
-        print(f'\tTemperature Regression R-squared: {r2_temp:.3f}')
-        print(f'\tWeather Condition Classification Accuracy: {accuracy_cond * 100:.2f}%\n\n')
-    
+        location = data['location_name'].iloc[0]
+        result, models = train_location(location, data, n_jobs=self.cpu_budget, search=self.search, n_iter=self.n_iter)
+        self.registry.save(location, self.registry.fingerprint(data), models, metrics=result.metrics)
+        self.print_results(result)
+        return result
+
+    @staticmethod
+    def print_results(result):
+        print(f'\nResults for {result.location}:')
+        print(f'\tTemperature Regression Mean Squared Error: {result.mse_temp:.3f}')
+        print(f'\tTemperature Regression R-squared: {result.r2_temp:.3f}')
+        print(f'\tWeather Condition Classification Accuracy: {result.accuracy_cond * 100:.2f}%')
+        print(f'\tTrained with {result.search} search in {result.seconds:.1f}s\n\n')
+
 def main():
-    global loc, reset
-    groupby = GroupBy()
-    reset = groupby._reset
-    loc = groupby.location_id
     with warnings.catch_warnings():
         warnings.filterwarnings("ignore", category=UserWarning)
         WeatherManager(DBConnect())
 
 if __name__ =='__main__':
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,150 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import NamedTuple
+
+import requests
+
+from weather_session import get_session
+
+
+class GeoLocation(NamedTuple):
+    name: str
+    latitude: float
+    longitude: float
+
+
+class GeocodeCache:
+    PLACE_URL = 'https://geocoding-api.open-meteo.com/v1/search'
+    IP_URL = 'https://ipinfo.io/json'
+    IP_TTL = 24 * 60 * 60
+    PLACE_COUNT = 10
+    QUALIFIER_FIELDS = ('country', 'country_code', 'admin1', 'admin2', 'admin3', 'admin4')
+
+    def __init__(self, path=None):
+        """
+        Persistent cache of place names and of the current IP resolved to coordinates.
+
+        Places are looked up once with the Open-Meteo geocoding API and kept for good.
+        The current IP is looked up with ipinfo and kept for `IP_TTL` seconds, since it
+        can change. Entries live in `data_files/geocode_cache.json` and are shared by
+        `SimpleWeather`, `WeatherForecast` and `HistoricalData`.
+
+        Parameters:
+            - `path` (Path, optional): The cache file. Defaults to `data_files/geocode_cache.json` next to this file.
+        """
+        self.path = Path(path) if path else Path(__file__).parent.absolute() / 'data_files' / 'geocode_cache.json'
+        self.lock = threading.Lock()
+        self.entries = self.load()
+
+    def load(self):
+        try:
+            return json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, suffix='.tmp')
+        with os.fdopen(fd, 'w') as file:
+            json.dump(self.entries, file, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def cached(self, key, ttl=None):
+        entry = self.entries.get(key)
+        if entry is None or (ttl is not None and time.time() - entry['resolved_at'] > ttl):
+            return None
+        return GeoLocation(entry['name'], entry['latitude'], entry['longitude'])
+
+    def store(self, key, location):
+        with self.lock:
+            self.entries[key] = {**location._asdict(), 'resolved_at': time.time()}
+            self.save()
+        return location
+
+    @staticmethod
+    def best_match(results, qualifiers):
+        """
+        Pick the result that matches the most qualifiers, such as the country or state in
+        'Paris, United States'. A qualifier matches a country, country code or region name,
+        ignoring case. Ties keep the API's own order, which ranks larger places first.
+        """
+        qualifiers = [i.lower() for i in qualifiers]
+
+        def score(result):
+            names = {str(result.get(i) or '').lower() for i in GeocodeCache.QUALIFIER_FIELDS}
+            return sum(i in names for i in qualifiers)
+        return max(results, key=score)
+
+    def place(self, place):
+        """
+        Resolve a place name to coordinates.
+
+        Open-Meteo searches by name only, so 'City, State, Country' falls back to its
+        first part when the full string has no match. The parts after the city then pick
+        between places of the same name. Abbreviations other than country codes, such as
+        'NY' for New York, are not recognised, so they are ignored.
+
+        Returns:
+            - `GeoLocation | None`: The best match, or None if the place is unknown.
+        """
+        key = f'place:{place.strip().lower()}'
+        location = self.cached(key)
+        if location is not None:
+            return location
+
+        parts = [i.strip() for i in place.split(',') if i.strip()]
+        for name in dict.fromkeys((place.strip(), parts[0] if parts else '')):
+            try:
+                response = get_session().get(self.PLACE_URL, params={'name': name, 'count': self.PLACE_COUNT, 'format': 'json'})
+                response.raise_for_status()
+                results = response.json().get('results')
+            except (requests.RequestException, ValueError) as e:
+                print("Error: Failed to fetch geocoding data.", e)
+                return None
+            if results:
+                match = self.best_match(results, parts[1:])
+                return self.store(key, GeoLocation(place, match['latitude'], match['longitude']))
+        return None
+
+    def current(self, token=None):
+        """
+        Resolve the current IP address to its city and coordinates.
+
+        Parameters:
+            - `token` (str, optional): The ipinfo API token.
+
+        Returns:
+            - `GeoLocation`: The city (or region) and its coordinates. Coordinates are
+            None if ipinfo did not return any.
+        """
+        location = self.cached('ip', ttl=self.IP_TTL)
+        if location is not None:
+            return location
+
+        response = get_session().get(self.IP_URL, params={'token': token} if token else None)
+        response.raise_for_status()
+        data = response.json()
+        latitude, longitude = (float(i) for i in data['loc'].split(',')) if data.get('loc') else (None, None)
+        location = GeoLocation(data.get('city') or data.get('region') or 'Unknown', latitude, longitude)
+        if latitude is None:
+            return location
+        return self.store('ip', location)
+
+
+_geocoder = None
+_geocoder_lock = threading.Lock()
+
+
+def get_geocoder():
+    """
+    Return the process-wide `GeocodeCache`, creating it on first use.
+    """
+    global _geocoder
+    with _geocoder_lock:
+        if _geocoder is None:
+            _geocoder = GeocodeCache()
+        return _geocoder
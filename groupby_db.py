@@ -1,5 +1,6 @@
 import re
-from dataclasses import dataclass
+from datetime import time
+from functools import total_ordering
 from pathlib import Path
 from typing import NamedTuple, Union
 
@@ -7,6 +8,7 @@ import pandas as pd
 import psycopg
 
 from weather_data import WeatherForecast
+from weather_db_connect import get_pool
 
 
 class SQLParams(NamedTuple):
@@ -23,49 +25,125 @@ class SQLFetch(NamedTuple):
     arg4: str = None
 
 
-@dataclass(order=True)
+@total_ordering
 class Args:
-    arg1: str = None
-    arg2: str = None
+    '''Rows and columns of a query result \n
+        ``'Args().frame'`` = Typed DataFrame (canonical form, built once and cached)\n
+        ``'Args().arg1'`` = All rows (only converted to lists when accessed)\n
+        ``'Args().arg2'`` = All columns
+    '''
+    
+    #**Columns fetched as Decimal are stored as floats in the frame
+    FLOAT_COLUMNS = ('min_temp_fah', 'max_temp_fah', 'temp_fah')
+    #**Composite key identifying one hourly record across snapshots
+    MERGE_KEYS = ('location_name', 'day', 'hour')
+    
+    def __init__(self, arg1=None, arg2=None, frame: pd.DataFrame = None):
+        self._rows = arg1
+        self._columns = arg2
+        self._frame = frame
+    
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame) -> 'Args':
+        return cls(frame=frame)
+    
+    @property
+    def frame(self) -> pd.DataFrame:
+        if self._frame is None and self._rows is not None:
+            frame = pd.DataFrame(self._rows, columns=self._columns)
+            for col in Args.FLOAT_COLUMNS:
+                if col in frame.columns:
+                    frame[col] = frame[col].astype('float64')
+            self._frame = frame
+        return self._frame
+    
+    @property
+    def arg1(self) -> list:
+        if self._rows is None and self._frame is not None:
+            self._rows = self._frame.values.tolist()
+        return self._rows
+    
+    @arg1.setter
+    def arg1(self, rows):
+        self._rows, self._frame = rows, None
+    
+    @property
+    def arg2(self) -> list:
+        if self._columns is None and self._frame is not None:
+            self._columns = self._frame.columns.tolist()
+        return self._columns
+    
+    @arg2.setter
+    def arg2(self, columns):
+        self._columns, self._frame = columns, None
+    
+    def __len__(self):
+        if self._rows is not None:
+            return len(self._rows)
+        return len(self._frame) if self._frame is not None else 0
+    
+    def __repr__(self):
+        return f'Args(arg1={self.arg1!r}, arg2={self.arg2!r})'
+    
+    def __eq__(self, other):
+        if not isinstance(other, Args):
+            return NotImplemented
+        return (self.arg1, self.arg2) == (other.arg1, other.arg2)
+    
+    def __lt__(self, other):
+        if not isinstance(other, Args):
+            return NotImplemented
+        return (self.arg1, self.arg2) < (other.arg1, other.arg2)
     
     # **Prints full database into a DataFrame
     def __str__(self):
         try:
-            df = pd.DataFrame(self.arg1, columns=self.arg2)
-            return str(df)
-        except (AttributeError, TypeError):
+            return str(self.frame)
+        except (AttributeError, TypeError, ValueError):
             return
     
-    def __add__(self, other, on_='timestamp', how_='outer'):
+    def __add__(self, other):
+        return self.merge(other)
+    
+    def merge(self, other: 'Args', how: str = 'outer', prefer: str = 'other') -> 'Args':
+        """
+        Merge two snapshots on the composite key (location_name, day, hour).
+
+        Columns present in both are coalesced column-wise with `combine_first`, so the
+        preferred side wins and missing values are filled from the other side.
+
+        Parameters:
+            - `other` (Args): The snapshot to merge with.
+            - `how` (str): 'outer', 'inner', 'left' or 'right' join. Defaults to 'outer'.
+            - `prefer` (str): 'other' (newer snapshot wins, as `+` does) or 'self'. Defaults to 'other'.
+
+        Returns:
+            - `Args`: The merged rows, in this snapshot's column order.
+        """
         if not isinstance(other, Args):
             raise ValueError("Can only add two Args instances.")
+        if prefer not in ('other', 'self'):
+            raise ValueError("prefer must be 'other' or 'self'.")
         
-        data = pd.DataFrame(self.arg1, columns=self.arg2)
-        other_data = pd.DataFrame(other.arg1, columns=other.arg2)
+        data, other_data = self.frame, other.frame
+        keys = [key for key in Args.MERGE_KEYS if key in data.columns and key in other_data.columns]
+        for key in keys:
+            #**Keys of different types (e.g. time vs str hours) are compared as strings
+            if data[key].dtype != other_data[key].dtype:
+                data = data.assign(**{key: data[key].astype(str)})
+                other_data = other_data.assign(**{key: other_data[key].astype(str)})
         
-        data['hour'] = data['hour'].astype(str)
-        other_data['hour'] = other_data['hour'].astype(str)
-
-        data['timestamp'] = f"{data['location_name']} {data['day']} {data['hour']}"
-        other_data['timestamp'] = f"{other_data['location_name']} {other_data['day']} {other_data['hour']}"
-        
-        merged_data = pd.merge(data, other_data, on=on_, how=how_)
-        merged_data.drop(columns=on_, inplace=True)
-
-        for col in self.arg2:
-            x_col = f"{col}_x"
-            y_col = f"{col}_y"
-            if x_col in merged_data.columns and y_col in merged_data.columns:
-                merged_data[col] = merged_data.apply(lambda row: row[y_col] if pd.notna(row[y_col]) else row[x_col], axis=1)
-                merged_data.drop(columns=[x_col, y_col], inplace=True)
-        return GroupBy._reset(merged_data)
+        merged_data = pd.merge(data, other_data, on=keys, how=how, suffixes=('_x', '_y'))
+        first, second = ('_y', '_x') if prefer == 'other' else ('_x', '_y')
+        for col in data.columns:
+            if f'{col}_x' in merged_data.columns and f'{col}_y' in merged_data.columns:
+                merged_data[col] = merged_data[f'{col}{first}'].combine_first(merged_data[f'{col}{second}'])
+        columns = list(data.columns) + [col for col in other_data.columns if col not in data.columns]
+        return Args.from_frame(merged_data[columns])
     
     def __getitem__(self, item):
-        if isinstance(self, DBConnect):
-            df = pd.DataFrame(self._.arg1, columns=self._.arg2)
-        elif isinstance(self, Args):
-            df = pd.DataFrame(self.arg1, columns=self.arg2)
-        return df[item], GroupBy._reset(df)
+        df = self.frame
+        return df[item], self
 
 
 class DBConnect:
@@ -77,17 +155,22 @@ class DBConnect:
     
     def __init__(self, sql_script_path: str = None):
         self.sql_script = self.insert_sql(sql_script_path) or self.get_sql_script()
-        self.connection = None
-        self.cursor = None
-        self.database = None
+        self.pool = None
+        self._database = None
         self.validator()
 
-    def __del__(self):
-        try:
-            if self.cursor:
-                self.cursor.close()
-        except (RecursionError, AttributeError) as e:
-            return self._string(e)
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self._database = None
+    
+    @property
+    def database(self) -> Args:
+        #**Full database is only queried on first access
+        if self._database is None and self.pool is not None:
+            self._database = self.query_data()
+        return self._database
     
     def __getattr__(self, _) -> str:
         try:
@@ -97,12 +180,10 @@ class DBConnect:
             return self._string(e)
     
     def __str__(self):
-        df = pd.DataFrame(self._.arg1, columns=self._.arg2)
-        return df.__repr__()
+        return self._.frame.__repr__()
     
     def __getitem__(self, item):
-        df = pd.DataFrame(self._.arg1, columns=self._.arg2)
-        return df[item], GroupBy._reset(df)
+        return self._[item]
     
     
     def _string(self, e=None) -> str:
@@ -128,12 +209,22 @@ class DBConnect:
         except TypeError:
             return 'Error encountered retrieving columns'
     
+    #**Column expressions of the reporting query that can be filtered on server-side
+    FILTER_COLUMNS = {
+        'location_id': 'r.location_id',
+        'day': 'r.day',
+        'hour': 'r.hour',
+        'condition': 'r.condition',
+        'temp_fah': 'r.temp_fah',
+        'humidity': 'r.humidity',
+    }
+    
     @staticmethod
     def group_where(column: str) -> str:
         #! Add more if needed
         match column:
             case 'location_id':
-                return 'WHERE l.location_id = '
+                return f'WHERE {DBConnect.FILTER_COLUMNS[column]} = '
             case _:
                 return ''
 
@@ -155,30 +246,66 @@ class DBConnect:
         global config
         config = SQLParams(*list(WeatherForecast.get_config().values())[-4:])
         try:
-            self.connection = psycopg.connect(
-                host=config.host,
-                dbname=config.database,
-                user=config.user,
-                password=config.password
-            )
-            self.cursor = self.connection.cursor()
-            self.database = self.query_data()
+            self.pool = get_pool(config)
         except (psycopg.Error, psycopg.OperationalError, FileNotFoundError, AttributeError) as e:
             self._string(e)
 
+    def connection(self):
+        """
+        Borrow a warm connection from the shared pool.
+
+        ``'with DBConnect().connection() as connection:'``\n
+        The connection is returned to the pool when the block exits.
+        """
+        return self.pool.connection()
+
+    def base_query(self) -> str:
+        #**Reporting query without its trailing ';' so clauses can be appended
+        return self.sql_script.arg1.rstrip().rstrip(';')
+
     def query_data(self) -> Args:
         columns = self.get_columns(self.sql_script.arg1)
         execute_ = self.sql_script.arg1
-        self.cursor.execute(execute_)
-        rows = self.cursor.fetchall()
+        with self.connection() as connection:
+            rows = connection.execute(execute_).fetchall()
         col_data = Args(arg1=rows, arg2=columns)
         return col_data #**Returns the full database including columns
     
+    def stream(self, batch_size: int = 10_000, arrow: bool = False, sql: str = None, params: list = None):
+        """
+        Stream the reporting query in chunks from a named server-side cursor.
+
+        Only `batch_size` rows are held in memory at a time, so analytics over years of
+        hourly rows run in constant memory.
+
+        Parameters:
+            - `batch_size` (int): Number of rows per chunk. Defaults to 10,000.
+            - `arrow` (bool): Yield `pyarrow.RecordBatch` instead of `pd.DataFrame`. Requires pyarrow.
+            - `sql` (str, optional): Query to stream instead of the full reporting query.
+            - `params` (list, optional): Parameters bound to `sql`.
+
+        Yields:
+            - `pd.DataFrame | pyarrow.RecordBatch`: Consecutive chunks of the result.
+        """
+        if arrow:
+            try:
+                import pyarrow as pa
+            except ImportError as e:
+                raise ImportError("Streaming Arrow record batches requires 'pyarrow'.") from e
+        columns = self.get_columns(self.sql_script.arg1)
+        with self.connection() as connection:
+            with connection.cursor(name='weather_stream') as cursor:
+                cursor.itersize = batch_size
+                cursor.execute(sql or self.sql_script.arg1, params)
+                while rows := cursor.fetchmany(batch_size):
+                    chunk = pd.DataFrame(rows, columns=columns)
+                    yield pa.RecordBatch.from_pandas(chunk, preserve_index=False) if arrow else chunk
+    
     @property
     def get_locations(self):
         try:
-            self.cursor.execute('SELECT location_id, location_name FROM locations')
-            locations = self.cursor.fetchall()
+            with self.connection() as connection:
+                locations = connection.execute('SELECT location_id, location_name FROM locations').fetchall()
             location_chart = pd.Series(data=[i[1] for i in locations],index=[i[0] for i in locations])
             return location_chart
         except (psycopg.errors.InvalidTextRepresentation, AttributeError) as e:
@@ -187,25 +314,103 @@ class DBConnect:
     def group_location_id(self, column: str, value: str) -> Args:
         try:
             columns = self.get_columns(self.sql_script.arg1)
-            sql_script = f'{self.sql_script.arg1[:-1]}\n{DBConnect.group_where(column)}\'{value}\';'
-            self.cursor.execute(sql_script)
-            rows = self.cursor.fetchall()
+            sql_script = f'{self.base_query()}\n{DBConnect.group_where(column)}%s;'
+            with self.connection() as connection:
+                rows = connection.execute(sql_script, (value,)).fetchall()
             data = Args(arg1=rows, arg2=columns)
             return data
         except (psycopg.errors.InvalidTextRepresentation, AttributeError) as e:
             return ValueError("Invalid input")
 
 
+class Query:
+    '''Chainable server-side filters, sent to PostgreSQL as one parameterized WHERE clause \n
+        ``'GroupBy.query().day('07/22/2023').hour(6, 18).humidity(40, 60).fetch()'``\n
+        Only the matching rows leave the server.
+    '''
+    
+    def __init__(self, database: DBConnect):
+        self.database = database
+        self.clauses = []
+        self.params = []
+
+    def where(self, column: str, operator: str, *values) -> 'Query':
+        expression = DBConnect.FILTER_COLUMNS[column]
+        match operator:
+            case 'between':
+                self.clauses.append(f'{expression} BETWEEN %s AND %s')
+            case '=' if column == 'day':
+                self.clauses.append(f"{expression} = TO_DATE(%s, 'MM/DD/YYYY')")
+            case '=':
+                self.clauses.append(f'{expression} = %s')
+            case _:
+                raise ValueError(f"Unsupported operator: {operator}")
+        self.params.extend(values)
+        return self
+
+    def location(self, id_: int|str) -> 'Query':
+        return self.where('location_id', '=', id_)
+
+    def day(self, day: str) -> 'Query':
+        return self.where('day', '=', day)
+
+    @staticmethod
+    def hour_bound(hour: int) -> time:
+        #**24 closes the day, so it covers every minute of hour 23
+        hour = int(hour)
+        return time.max if hour == 24 else time(hour)
+
+    def hour(self, min_hour: int, max_hour: int) -> 'Query':
+        return self.where('hour', 'between', Query.hour_bound(min_hour), Query.hour_bound(max_hour))
+
+    def condition(self, condition: str) -> 'Query':
+        return self.where('condition', '=', condition)
+
+    def temperature(self, min_temp, max_temp) -> 'Query':
+        return self.where('temp_fah', 'between', min_temp, max_temp)
+
+    def humidity(self, min_humidity, max_humidity) -> 'Query':
+        return self.where('humidity', 'between', min_humidity, max_humidity)
+
+    def sql(self) -> str:
+        where = f"\nWHERE {' AND '.join(self.clauses)}" if self.clauses else ''
+        return f'{self.database.base_query()}{where};'
+
+    def stream(self, batch_size: int = 10_000, arrow: bool = False):
+        #**Same filters, streamed in chunks through DBConnect.stream
+        return self.database.stream(batch_size, arrow, sql=self.sql(), params=self.params)
+
+    def fetch(self) -> Args:
+        try:
+            columns = self.database.get_columns(self.database.sql_script.arg1)
+            with self.database.connection() as connection:
+                rows = connection.execute(self.sql(), self.params).fetchall()
+            return Args(arg1=rows, arg2=columns)
+        except (psycopg.errors.InvalidTextRepresentation, psycopg.errors.InvalidDatetimeFormat, psycopg.errors.DatetimeFieldOverflow):
+            return ValueError("Invalid input")
+
+
 class GroupBy:
+    _db = None
+
     def __init__(cls):
-        cls.database = DBConnect().query_data()
+        cls.database = GroupBy.db().database
+    
+    @staticmethod
+    def db() -> DBConnect:
+        #**One DBConnect shared by every GroupBy call
+        if GroupBy._db is None:
+            GroupBy._db = DBConnect()
+        return GroupBy._db
+    
+    @staticmethod
+    def query() -> Query:
+        return Query(GroupBy.db())
     
     @staticmethod
     def _reset(pd_: Union[pd.DataFrame, pd.Series, 'DBConnect', 'Args']) -> Union['Args', list, pd.DataFrame]:
         if isinstance(pd_, pd.DataFrame):
-            rows = pd_.values.tolist()
-            columns = pd_.columns.tolist()
-            data_reset = Args(arg1=rows, arg2=columns)
+            data_reset = Args.from_frame(pd_)
             return data_reset
         
         elif isinstance(pd_, pd.Series):
@@ -213,24 +418,33 @@ class GroupBy:
             return data_reset
         
         elif isinstance(pd_, DBConnect):
-            rows = pd_._.arg1
-            columns = pd_._.arg2
-            data_reset = pd.DataFrame(rows, columns=columns)
+            data_reset = pd_._.frame
             return data_reset
         
         elif isinstance(pd_, Args):
-            rows = pd_.arg1
-            columns = pd_.arg2
-            data_reset = pd.DataFrame(rows, columns=columns)
+            data_reset = pd_.frame
             return data_reset
     
+    @staticmethod
+    def _frame(data: Union[pd.DataFrame, 'Args']) -> pd.DataFrame:
+        #**Chained filters accept Args or a DataFrame, so they never rebuild the frame
+        if isinstance(data, pd.DataFrame):
+            return data
+        return data.frame
+    
+    @staticmethod
+    def _fetch(query: Query) -> pd.DataFrame:
+        #**Unchained filters run on the server, so only the matching rows are fetched
+        result = query.fetch()
+        return result.frame if isinstance(result, Args) else result
+    
     @staticmethod
     def location_id(id_: int|str=None) -> Args:
         try:
             if id_ is not None:
-                data = DBConnect().group_location_id('location_id', id_)
+                data = GroupBy.db().group_location_id('location_id', id_)
                 return data
-            return DBConnect().get_locations
+            return GroupBy.db().get_locations
         except (psycopg.errors.InvalidTextRepresentation, psycopg.errors.SyntaxError):
             return ValueError("Invalid input")
     
@@ -238,9 +452,8 @@ class GroupBy:
     def filter_by_day(cls, day:str, data=None) -> Args:
         try:
             if data is None:
-                data = pd.DataFrame(cls.database.arg1, columns=cls.database.arg2)
-            else:
-                data = pd.DataFrame(data.arg1, columns=data.arg2)
+                return cls._fetch(GroupBy.query().day(day))
+            data = cls._frame(data)
             
             filtered_data = data[data['day'] == day]
             return filtered_data
@@ -250,27 +463,28 @@ class GroupBy:
     
     @classmethod
     def filter_by_hour(cls, min_hour:int, max_hour:int, data=None) -> Args:
-        min_hour, max_hour = map(lambda i: f'{str(i).zfill(2)}:00:00', [min_hour, max_hour])
         try:
             if data is None:
-                df = pd.DataFrame(cls.database.arg1, columns=cls.database.arg2)
+                return cls._fetch(GroupBy.query().hour(min_hour, max_hour))
+            df = cls._frame(data)
+            hours = df['hour']
+            if len(hours) and isinstance(hours.iloc[0], str):
+                min_hour, max_hour = map(lambda i: f'{str(i).zfill(2)}:00:00', [min_hour, max_hour])
             else:
-                df = pd.DataFrame(data.arg1, columns=data.arg2)
-            df['hour'] = df['hour'].astype(str)
-            filtered_data = df[(df['hour'] >= min_hour) & (df['hour'] <= max_hour)]
+                min_hour, max_hour = Query.hour_bound(min_hour), Query.hour_bound(max_hour)
+            filtered_data = df[(hours >= min_hour) & (hours <= max_hour)]
             return filtered_data
             
         
-        except (psycopg.errors.InvalidTextRepresentation, psycopg.errors.SyntaxError):
+        except (psycopg.errors.InvalidTextRepresentation, psycopg.errors.SyntaxError, ValueError):
             return ValueError("Invalid input")
     
     @classmethod
     def filter_by_condition(cls, condition, data=None) -> Args:
         try:
             if data is None:
-                df = pd.DataFrame(cls.database.arg1, columns=cls.database.arg2)
-            else:
-                df = pd.DataFrame(data.arg1, columns=data.arg2)
+                return cls._fetch(GroupBy.query().condition(condition))
+            df = cls._frame(data)
             filtered_data = df[df['condition'] == condition]
             return filtered_data
         
@@ -281,9 +495,8 @@ class GroupBy:
     def filter_by_temperature(cls, min_temp, max_temp, data=None) -> Args:
         try:
             if data is None:
-                df = pd.DataFrame(cls.database.arg1, columns=cls.database.arg2)
-            else:
-                df = pd.DataFrame(data.arg1, columns=data.arg2)
+                return cls._fetch(GroupBy.query().temperature(min_temp, max_temp))
+            df = cls._frame(data)
             filtered_data = df[(df['temp_fah'] >= min_temp) & (df['temp_fah'] <= max_temp)]
             return filtered_data
         
@@ -294,9 +507,8 @@ class GroupBy:
     def filter_by_humidity(cls, min_humidity, max_humidity, data=None) -> Args:
         try:
             if data is None:
-                df = pd.DataFrame(cls.database.arg1, columns=cls.database.arg2)
-            else:
-                df = pd.DataFrame(data.arg1, columns=data.arg2)
+                return cls._fetch(GroupBy.query().humidity(min_humidity, max_humidity))
+            df = cls._frame(data)
             filtered_data = df[(df['humidity'] >= min_humidity) & (df['humidity'] <= max_humidity)]
             return filtered_data
         
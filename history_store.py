@@ -0,0 +1,143 @@
+import os
+import re
+import tempfile
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+
+RECORD = np.dtype([('hour', '<i4'), ('temperature', '<f4')])
+
+
+class HistoryColumns(NamedTuple):
+    hours: np.ndarray
+    temperature: np.ndarray
+
+    def __len__(self):
+        return len(self.hours)
+
+    def dates(self):
+        return self.hours.astype('datetime64[h]')
+
+
+class HistoryStore:
+    def __init__(self, location, path=None):
+        """
+        Columnar store of the hourly temperature history of one location.
+
+        The history is one file, `data_files/history/<location>/hourly.bin`, of fixed-size
+        records. Each record holds the epoch hour of a reading (int32, sorted and unique)
+        and its temperature in Fahrenheit (float32). Because the hour and the temperature
+        share a record, the two columns can never drift apart. The file is memory-mapped
+        on read, and date ranges are found with a binary search over the hours. A slice
+        only touches the pages it covers, however long the history is.
+
+        Parameters:
+            - `location` (str): The location the history belongs to.
+            - `path` (Path, optional): The history folder. Defaults to `data_files/history/` next to this file.
+        """
+        root = Path(path) if path else Path(__file__).parent.absolute() / 'data_files' / 'history'
+        self.location = location
+        self.path = root / (re.sub(r'\W+', '_', location).strip('_') or 'Unknown')
+        self.file = self.path / 'hourly.bin'
+
+    @staticmethod
+    def epoch_hours(times) -> np.ndarray:
+        """
+        Convert ISO timestamps ('YYYY-MM-DDTHH:MM'), dates or datetime64 values to epoch hours.
+        """
+        return np.asarray(times, dtype='datetime64[h]').astype(np.int32)
+
+    def count(self):
+        """
+        Returns:
+            - `int`: The number of complete records. A partial record left by an interrupted
+            append is not counted.
+        """
+        try:
+            return self.file.stat().st_size // RECORD.itemsize
+        except OSError:
+            return 0
+
+    def load(self, mmap=True) -> HistoryColumns:
+        """
+        Read the stored history.
+
+        Parameters:
+            - `mmap` (bool): Memory-map the file instead of reading it. Defaults to True.
+
+        Returns:
+            - `HistoryColumns`: The epoch hours and temperatures. Both are empty if nothing is stored.
+        """
+        count = self.count()
+        if not count:
+            records = np.empty(0, dtype=RECORD)
+        elif mmap:
+            records = np.memmap(self.file, dtype=RECORD, mode='r', shape=(count,))
+        else:
+            records = np.fromfile(self.file, dtype=RECORD, count=count)
+        return HistoryColumns(records['hour'], records['temperature'])
+
+    def __len__(self):
+        return self.count()
+
+    def range(self, start=None, end=None) -> HistoryColumns:
+        """
+        Slice the readings with `start <= time < end` in O(log n).
+
+        Parameters:
+            - `start`, `end` (str | date | np.datetime64, optional): The bounds. Open if None.
+
+        Returns:
+            - `HistoryColumns`: Memory-mapped views of the readings in range.
+        """
+        history = self.load()
+        lo = 0 if start is None else np.searchsorted(history.hours, self.epoch_hours(start), side='left')
+        hi = len(history) if end is None else np.searchsorted(history.hours, self.epoch_hours(end), side='left')
+        return HistoryColumns(history.hours[lo:hi], history.temperature[lo:hi])
+
+    def last_hour(self):
+        """
+        Returns:
+            - `np.datetime64 | None`: The time of the latest stored reading, or None if empty.
+        """
+        hours = self.load().hours
+        return hours[-1].astype('datetime64[h]') if len(hours) else None
+
+    def write(self, hours, temperature):
+        """
+        Merge readings into the store, replacing stored readings of the same hour.
+
+        When every new reading is later than the stored history (a regular sync), the
+        records are appended and nothing stored is read or rewritten. Otherwise the merged
+        history is written to a temporary file and moved into place in one step.
+
+        Returns:
+            - `int`: The number of stored readings.
+        """
+        hours = self.epoch_hours(hours) if np.asarray(hours).dtype.kind in 'UOM' else np.asarray(hours, dtype=np.int32)
+        temperature = np.asarray(temperature, dtype=np.float32)
+        if len(hours) != len(temperature):
+            raise ValueError(f'{len(hours)} hours but {len(temperature)} temperatures')
+        #**The first occurrence wins, so new readings replace stored ones
+        hours, first = np.unique(hours, return_index=True)
+        records = np.empty(len(hours), dtype=RECORD)
+        records['hour'], records['temperature'] = hours, temperature[first]
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        count = self.count()
+        if not count or (len(records) and records['hour'][0] > self.load().hours[count - 1]):
+            #**Drop a partial record an interrupted append may have left
+            if self.file.exists():
+                os.truncate(self.file, count * RECORD.itemsize)
+            with open(self.file, 'ab') as file:
+                records.tofile(file)
+            return count + len(records)
+
+        merged = np.concatenate((records, np.fromfile(self.file, dtype=RECORD, count=count)))
+        _, first = np.unique(merged['hour'], return_index=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as file:
+            merged[first].tofile(file)
+        os.replace(tmp_path, self.file)
+        return len(first)
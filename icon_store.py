@@ -0,0 +1,68 @@
+import json
+from hashlib import sha256
+from pathlib import Path
+
+
+class IconStore:
+    def __init__(self, path=None):
+        """
+        Content-addressed store for the weather icons.
+
+        Each icon is saved once as `icons/<code>_<variant>.png`, and `icons/manifest.json`
+        maps every file to the sha256 of its content. Forecast records only keep the icon
+        code. Readers resolve the bytes through the store and can tell a changed file from
+        an intact one.
+
+        Parameters:
+            - `path` (Path, optional): The icons folder. Defaults to `icons/` next to this file.
+        """
+        self.path = Path(path) if path else Path(__file__).parent.absolute() / 'icons'
+        self.manifest_path = self.path / 'manifest.json'
+        self.manifest = self.load_manifest()
+
+    @staticmethod
+    def file_name(icon_code, variant='day'):
+        return f'{icon_code}_{variant}.png'
+
+    def load_manifest(self):
+        try:
+            return json.loads(self.manifest_path.read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def save(self):
+        self.manifest_path.write_text(json.dumps(self.manifest, indent=2, sort_keys=True))
+
+    def digest(self, icon_code, variant='day'):
+        return self.manifest.get(self.file_name(icon_code, variant))
+
+    def get(self, icon_code, variant='day'):
+        """
+        Read an icon from the store.
+
+        Returns:
+            - `bytes | None`: The PNG bytes, or None if the icon is missing or its
+            content no longer matches the manifest.
+        """
+        file_name = self.file_name(icon_code, variant)
+        try:
+            png_bytes = (self.path / file_name).read_bytes()
+        except OSError:
+            return None
+        if self.manifest.get(file_name) != sha256(png_bytes).hexdigest():
+            return None
+        return png_bytes
+
+    def put(self, icon_code, variant, png_bytes):
+        """
+        Save an icon and record its content hash. Call `save()` to persist the manifest.
+
+        Returns:
+            - `str`: The sha256 digest of the icon.
+        """
+        file_name = self.file_name(icon_code, variant)
+        digest = sha256(png_bytes).hexdigest()
+        if self.manifest.get(file_name) != digest or not (self.path / file_name).is_file():
+            (self.path / file_name).write_bytes(png_bytes)
+            self.manifest[file_name] = digest
+        return digest
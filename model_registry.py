@@ -0,0 +1,220 @@
+import json
+import os
+import re
+import tempfile
+import threading
+from hashlib import sha256
+from pathlib import Path
+from typing import NamedTuple
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from weather_features import FEATURE_NAMES, build_features, day_value, hour_seconds
+
+
+class LocationModels(NamedTuple):
+    regressor: object
+    classifier: object
+    scaler: object
+    label_encoder: object
+
+
+class Prediction(NamedTuple):
+    temp_fah: float
+    condition: str
+
+
+class FlatForest:
+    def __init__(self, forest):
+        """
+        The trees of a fitted random forest packed into flat arrays and walked together.
+
+        Every node of every tree gets one slot. Leaves point to themselves, so stepping all
+        trees `max_depth` times lands each one on its leaf. A single prediction is then a few
+        NumPy operations instead of one `predict` call per tree.
+
+        Parameters:
+            - `forest` (RandomForestRegressor | RandomForestClassifier): The fitted forest.
+        """
+        trees = [estimator.tree_ for estimator in forest.estimators_]
+        offsets = np.cumsum([0] + [tree.node_count for tree in trees[:-1]])
+        left, right, feature, threshold, value = [], [], [], [], []
+        for offset, tree in zip(offsets, trees):
+            nodes = np.arange(tree.node_count)
+            leaf = tree.children_left < 0
+            left.append(np.where(leaf, nodes, tree.children_left) + offset)
+            right.append(np.where(leaf, nodes, tree.children_right) + offset)
+            feature.append(np.where(leaf, 0, tree.feature))
+            threshold.append(tree.threshold)
+            leaf_value = tree.value[:, 0, :]
+            #**Class counts become probabilities, as in `predict_proba`
+            if hasattr(forest, 'classes_'):
+                leaf_value = leaf_value / leaf_value.sum(axis=1, keepdims=True)
+            value.append(leaf_value)
+        self.roots = offsets
+        self.left = np.concatenate(left)
+        self.right = np.concatenate(right)
+        self.feature = np.concatenate(feature)
+        self.threshold = np.concatenate(threshold)
+        self.value = np.concatenate(value)
+        self.depth = max(tree.max_depth for tree in trees)
+        self.classes = getattr(forest, 'classes_', None)
+
+    def predict(self, features):
+        """
+        Predict one sample.
+
+        Parameters:
+            - `features` (np.ndarray): The 1-D feature vector of the sample.
+
+        Returns:
+            - `float | int`: The mean of the trees for a regressor, or the most probable class.
+        """
+        #**Trees compare float32 features, like `tree_.predict`
+        features = np.asarray(features, dtype=np.float32)
+        node = self.roots
+        for _ in range(self.depth):
+            node = np.where(features[self.feature[node]] <= self.threshold[node], self.left[node], self.right[node])
+        value = self.value[node].sum(axis=0)
+        if self.classes is None:
+            return value[0] / len(self.roots)
+        return self.classes[value.argmax()]
+
+
+class ModelRegistry:
+    def __init__(self, path=None):
+        """
+        On-disk registry of the fitted models of every location.
+
+        Each location is saved once as `models/<location>.joblib` holding its regressor,
+        classifier, scaler and label encoder. `models/index.json` maps every location to its
+        file and the fingerprint of the data it was trained on, so unchanged locations are
+        not retrained. Models are loaded lazily on first prediction and kept in memory, along
+        with `FlatForest` copies of both forests that serve single predictions.
+
+        Parameters:
+            - `path` (Path, optional): The models folder. Defaults to `models/` next to this file.
+        """
+        self.path = Path(path) if path else Path(__file__).parent.absolute() / 'models'
+        self.index_path = self.path / 'index.json'
+        self.index = self.load_index()
+        self.models = {}
+        self.forests = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def file_name(location):
+        return (re.sub(r'\W+', '_', location).strip('_') or 'Unknown') + '.joblib'
+
+    @staticmethod
+    def fingerprint(data: pd.DataFrame) -> str:
+        """
+        Hash the rows of one location, independent of the order the query returned them in.
+
+        The feature names are hashed too, so models trained on other features are stale.
+
+        Returns:
+            - `str`: The sha256 digest of the sorted rows.
+        """
+        data = data.sort_values(['day', 'hour'], kind='stable').reset_index(drop=True)
+        digest = sha256(','.join(FEATURE_NAMES).encode())
+        digest.update(pd.util.hash_pandas_object(data, index=False).to_numpy().tobytes())
+        return digest.hexdigest()
+
+    def load_index(self):
+        try:
+            return json.loads(self.index_path.read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def is_current(self, location, fingerprint):
+        entry = self.index.get(location)
+        return bool(entry) and entry['fingerprint'] == fingerprint and (self.path / entry['file']).is_file()
+
+    def save(self, location, fingerprint, models: LocationModels, metrics=None):
+        """
+        Persist the models of a location and record the fingerprint of its training data.
+
+        Files are written to a temporary path first and moved into place, so a reader never
+        sees a partial file.
+        """
+        self.path.mkdir(parents=True, exist_ok=True)
+        file_name = self.file_name(location)
+        with self.lock:
+            fd, tmp_path = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as file:
+                joblib.dump(tuple(models), file)
+            os.replace(tmp_path, self.path / file_name)
+            self.index[location] = {'file': file_name, 'fingerprint': fingerprint, 'metrics': metrics or {}}
+            self.models[location] = models
+            self.forests.pop(location, None)
+
+            fd, tmp_path = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+            with os.fdopen(fd, 'w') as file:
+                json.dump(self.index, file, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.index_path)
+
+    def load(self, location) -> LocationModels:
+        """
+        Return the models of a location, reading them from disk on first use.
+
+        Raises:
+            - `KeyError`: If no models were trained for `location`.
+        """
+        models = self.models.get(location)
+        if models is None:
+            with self.lock:
+                if location not in self.models:
+                    if location not in self.index:
+                        raise KeyError(f"No trained models for '{location}'")
+                    self.models[location] = LocationModels(*joblib.load(self.path / self.index[location]['file']))
+                models = self.models[location]
+        return models
+
+    def predict(self, location, hour, day, humidity) -> Prediction:
+        """
+        Predict the temperature and condition of a location at a given hour.
+
+        Parameters:
+            - `location` (str): The location name, as stored in the database.
+            - `hour` (int | str | datetime.time): The hour of day, 'HH:MM[:SS]' or a time.
+            - `day` (str | datetime.date): The day, 'MM/DD/YYYY' or a date.
+            - `humidity` (int): The relative humidity in percent.
+
+        Returns:
+            - `Prediction`: The temperature in Fahrenheit and the weather condition.
+        """
+        forests = self.forests.get(location)
+        if forests is None:
+            models = self.load(location)
+            scaler = models.scaler
+            forests = self.forests[location] = (FlatForest(models.regressor), FlatForest(models.classifier),
+                                                scaler.mean_.astype(np.float32), scaler.scale_.astype(np.float32),
+                                                models.label_encoder.classes_)
+        regressor, classifier, mean, scale, labels = forests
+        features = build_features([humidity], [hour_seconds(hour)], [day_value(day)])[0]
+        #**Scaled in float32, like `StandardScaler.transform` on float32 features
+        temp_fah = regressor.predict((features - mean) / scale)
+        condition = labels[classifier.predict(features)]
+        return Prediction(float(temp_fah), str(condition))
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """
+    Return the process-wide `ModelRegistry`, creating it on first use.
+    """
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ModelRegistry()
+        return _registry
+
+
+def predict(location, hour, day, humidity) -> Prediction:
+    return get_registry().predict(location, hour, day, humidity)
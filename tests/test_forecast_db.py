@@ -0,0 +1,55 @@
+import copy
+import os
+
+import pytest
+
+psycopg = pytest.importorskip('psycopg')
+
+from weather_db_connect import ForecastDB
+
+#**Point WEATHER_TEST_DB at a scratch database as 'host,database,user,password'; its forecast tables are rewritten
+TEST_DB = os.environ.get('WEATHER_TEST_DB')
+pytestmark = pytest.mark.skipif(not TEST_DB, reason='WEATHER_TEST_DB is not set')
+
+COUNTS = '''SELECT (SELECT COUNT(*) FROM Locations), (SELECT COUNT(*) FROM Temperature),
+                   (SELECT COUNT(*) FROM Hourly), (SELECT COUNT(*) FROM WeatherEmoji)'''
+
+
+@pytest.fixture
+def refresh(monkeypatch):
+    """
+    Refresh the test database with the stored forecast, changed by `edit` if given.
+    """
+    load_json = ForecastDB.load_json
+    data = load_json('Forecast_data.json')
+
+    def run(edit=None):
+        forecast = copy.deepcopy(data)
+        if edit:
+            edit(forecast)
+        monkeypatch.setattr(ForecastDB, 'load_json', staticmethod(
+            lambda file, folder='data_files': forecast if file == 'Forecast_data.json' else load_json(file, folder)))
+        with ForecastDB(TEST_DB.split(',')) as db:
+            db.refresh()
+            db.cursor.execute(COUNTS)
+            counts = db.cursor.fetchone()
+            db.cursor.execute('''SELECT h.temp_fah FROM Hourly h JOIN Temperature t USING (temperature_id)
+                                 JOIN Locations l USING (location_id)
+                                 WHERE l.location_name = %s AND t.day = %s AND h.hour = %s''',
+                              (forecast[0]['location'], forecast[0]['day']['date'],
+                               forecast[0]['day']['hourly_data'][0]['hour']))
+            return counts, float(db.cursor.fetchone()[0])
+    return run
+
+
+def test_refresh_is_idempotent(refresh):
+    counts, _ = refresh()
+    assert refresh()[0] == counts
+
+
+def test_refresh_updates_rows_in_place(refresh):
+    def warmer(forecast):
+        forecast[0]['day']['hourly_data'][0]['temperature']['Fahrenheit'] = 123.45
+
+    counts, _ = refresh()
+    assert refresh(warmer) == (counts, pytest.approx(123.45))
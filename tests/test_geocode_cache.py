@@ -0,0 +1,35 @@
+from geocode_cache import GeocodeCache
+
+PARIS = [
+    {'name': 'Paris', 'latitude': 48.85, 'longitude': 2.35, 'country': 'France', 'country_code': 'FR',
+     'admin1': 'Île-de-France'},
+    {'name': 'Paris', 'latitude': 33.66, 'longitude': -95.56, 'country': 'United States', 'country_code': 'US',
+     'admin1': 'Texas', 'admin2': 'Lamar'},
+    {'name': 'Paris', 'latitude': 36.30, 'longitude': -88.33, 'country': 'United States', 'country_code': 'US',
+     'admin1': 'Tennessee', 'admin2': 'Henry'},
+]
+
+
+def geocoder(stub_server, tmp_path):
+    server = stub_server(lambda path, query: (200, {}, {'results': PARIS} if query['name'] == 'Paris' else {}))
+    cache = GeocodeCache(path=tmp_path / 'geocode_cache.json')
+    cache.PLACE_URL = server.url
+    return server, cache
+
+
+def test_qualifiers_pick_between_places_of_the_same_name(stub_server, tmp_path):
+    _, cache = geocoder(stub_server, tmp_path)
+    assert cache.place('Paris').longitude == 2.35
+    assert cache.place('Paris, United States').longitude == -95.56
+    assert cache.place('Paris, Tennessee, United States').longitude == -88.33
+    assert cache.place('Paris, TN, US').longitude == -95.56
+
+
+def test_places_are_cached(stub_server, tmp_path):
+    server, cache = geocoder(stub_server, tmp_path)
+    assert cache.place('Paris, Texas').latitude == 33.66
+    assert [i['name'] for _, i in server.requests] == ['Paris, Texas', 'Paris']
+    server.requests.clear()
+    assert GeocodeCache(path=tmp_path / 'geocode_cache.json').place('paris, texas').latitude == 33.66
+    assert server.requests == []
+    assert cache.place('Atlantis') is None
@@ -0,0 +1,19 @@
+from datetime import time
+
+import pandas as pd
+
+from groupby_db import GroupBy, Query
+
+HOURS = pd.DataFrame({'hour': [time(0), time(12), time(23)], 'temp_fah': [40.0, 55.0, 42.0]})
+
+
+def test_hour_24_closes_the_day():
+    assert Query(None).hour(0, 24).params == [time(0), time.max]
+    assert len(GroupBy.filter_by_hour(0, 24, data=HOURS)) == 3
+    assert len(GroupBy.filter_by_hour(0, 12, data=HOURS)) == 2
+    assert len(GroupBy.filter_by_hour(0, 24, data=HOURS.astype({'hour': str}))) == 3
+
+
+def test_out_of_range_hours_are_invalid_input():
+    assert repr(GroupBy.filter_by_hour(0, 25, data=HOURS)) == repr(ValueError('Invalid input'))
+    assert repr(GroupBy.filter_by_hour(-1, 5, data=HOURS)) == repr(ValueError('Invalid input'))
@@ -0,0 +1,81 @@
+import json
+
+import numpy as np
+
+from history_store import HistoryStore
+from weather_data import ConfigInfo, HistoricalData, LocationInfo
+
+CONFIG = ConfigInfo('weather', 'forecast', 'geo', 'localhost', 'weather', 'user', 'password')
+
+
+def archive(available_until):
+    """
+    Answer like the Open-Meteo archive, with readings up to `available_until` and nulls after it.
+    """
+    def respond(path, query):
+        start, end = np.datetime64(query['start_date'], 'h'), np.datetime64(query['end_date'], 'h') + 24
+        hours = np.arange(start, end)
+        temperature = [float(i.astype(np.int32)) if i <= np.datetime64(available_until, 'h') else None
+                       for i in hours]
+        return 200, {}, {'hourly': {'time': [str(i)[:13] + ':00' for i in hours], 'temperature_2m': temperature}}
+    return respond
+
+
+def history(server, tmp_path, end_date):
+    data = HistoricalData('Boston, MA', '2023-01-01', end_date, chunk_days=2, config=CONFIG)
+    data.base_url = server.url
+    data.coordinates = LocationInfo(-71.06, 42.36)
+    data.store = HistoryStore('Boston, MA', path=tmp_path)
+    return data
+
+
+def test_sync_resumes_after_the_last_stored_hour(stub_server, tmp_path):
+    server = stub_server(archive('2023-01-05T11'))
+    assert history(server, tmp_path, '2023-01-05').sync() == 4 * 24 + 12
+    #**Chunks are fetched in parallel, so they arrive in any order
+    assert sorted((i['start_date'], i['end_date']) for _, i in server.requests) == [
+        ('2023-01-01', '2023-01-02'), ('2023-01-03', '2023-01-04'), ('2023-01-05', '2023-01-05')]
+
+    #**The trailing hours the archive did not have yet are fetched on the next sync
+    server.requests.clear()
+    server.respond = archive('2023-01-06T23')
+    data = history(server, tmp_path, '2023-01-06')
+    inode = data.store.file.stat().st_ino
+    assert data.sync() == 6 * 24
+    #**The stored hours of the first day are dropped, so the file is appended to, not rewritten
+    assert data.store.file.stat().st_ino == inode
+    assert [(i['start_date'], i['end_date']) for _, i in server.requests] == [('2023-01-05', '2023-01-06')]
+
+    stored = data.store.load()
+    assert np.all(np.diff(stored.hours) == 1)
+    assert np.array_equal(stored.temperature, stored.hours.astype(np.float32))
+
+
+def test_sync_is_a_no_op_when_up_to_date(stub_server, tmp_path):
+    server = stub_server(archive('2023-01-02T23'))
+    data = history(server, tmp_path, '2023-01-02')
+    assert data.sync() == 48
+    server.requests.clear()
+    assert data.sync() == 48 and server.requests == []
+
+
+def test_first_sync_of_the_current_location_imports_the_legacy_json(stub_server, tmp_path):
+    legacy = {f'Date: 2023-01-0{day}': {key: value for hour in range(24) for key, value in (
+        (f'Time {hour + 1}', f'{hour:02}:00:00'), (f'Temperature {hour + 1}', -1.0))} for day in (1, 2)}
+    (tmp_path / 'History_data.json').write_text(json.dumps(legacy))
+    server = stub_server(archive('2023-01-03T23'))
+
+    data = HistoricalData(None, '2023-01-01', '2023-01-03', chunk_days=2, config=CONFIG)
+    data.base_url = server.url
+    data.legacy_path = tmp_path / 'History_data.json'
+    data.coordinates = LocationInfo(-71.06, 42.36)
+    data.store = HistoryStore('Boston, MA', path=tmp_path)
+    assert data.sync() == 72
+    assert [(i['start_date'], i['end_date']) for _, i in server.requests] == [('2023-01-03', '2023-01-03')]
+    assert np.array_equal(data.store.load().temperature[:48], np.full(48, -1, dtype=np.float32))
+
+    #**A named place never reads the file, which only ever held the current location
+    named = history(server, tmp_path / 'named', '2023-01-01')
+    named.legacy_path = data.legacy_path
+    named.sync()
+    assert named.store.load().temperature[0] != -1
@@ -0,0 +1,47 @@
+import numpy as np
+
+from history_store import RECORD, HistoryStore
+
+
+def hours(start, count):
+    return np.arange(np.datetime64(start, 'h'), np.datetime64(start, 'h') + count)
+
+
+def test_append_keeps_columns_aligned(tmp_path):
+    store = HistoryStore('Boston, MA', path=tmp_path)
+    assert store.write(hours('2023-01-01T00', 48), np.arange(48)) == 48
+    size = store.file.stat().st_size
+    assert store.write(hours('2023-01-03T00', 24), np.arange(48, 72)) == 72
+    assert store.file.stat().st_size == size + 24 * RECORD.itemsize
+
+    history = store.load()
+    assert np.all(np.diff(history.hours) == 1)
+    assert np.array_equal(history.temperature, np.arange(72, dtype=np.float32))
+
+
+def test_overlapping_write_replaces_stored_readings(tmp_path):
+    store = HistoryStore('Boston, MA', path=tmp_path)
+    store.write(hours('2023-01-01T00', 24), np.zeros(24))
+    assert store.write(hours('2023-01-01T12', 24), np.ones(24)) == 36
+    history = store.load()
+    assert np.array_equal(history.temperature, np.r_[np.zeros(12), np.ones(24)].astype(np.float32))
+
+
+def test_range_and_last_hour(tmp_path):
+    store = HistoryStore('Boston, MA', path=tmp_path)
+    assert store.last_hour() is None and len(store.range()) == 0
+    store.write(hours('2023-03-01T00', 72), np.arange(72))
+    day = store.range('2023-03-02', '2023-03-03')
+    assert list(day.dates()[[0, -1]]) == [np.datetime64('2023-03-02T00'), np.datetime64('2023-03-02T23')]
+    assert np.array_equal(day.temperature, np.arange(24, 48, dtype=np.float32))
+    assert store.last_hour() == np.datetime64('2023-03-03T23')
+
+
+def test_partial_record_from_interrupted_append_is_ignored(tmp_path):
+    store = HistoryStore('Boston, MA', path=tmp_path)
+    store.write(hours('2023-01-01T00', 24), np.arange(24))
+    with open(store.file, 'ab') as file:
+        file.write(b'\x01\x02\x03')
+    assert len(store) == 24
+    assert store.write(hours('2023-01-02T00', 1), [99]) == 25
+    assert store.load().temperature[-1] == 99
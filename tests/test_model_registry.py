@@ -0,0 +1,88 @@
+from datetime import date, time
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+from forecast_predictive import WeatherManager
+from model_registry import FlatForest, LocationModels, ModelRegistry
+from weather_features import frame_features
+
+LOCATION = 'Boston, MA'
+CONDITIONS = np.array(['Clear Sky', 'Few Clouds', 'Light Rain', 'Snow'])
+
+
+def frame(rows=400, seed=0):
+    rng = np.random.default_rng(seed)
+    #**Every (day, hour) occurs once, as the natural keys guarantee for stored rows
+    slots = rng.choice(365 * 24, rows, replace=False)
+    days = pd.Timestamp('2023-01-01') + pd.to_timedelta(slots // 24, unit='D')
+    hours = slots % 24
+    humidity = rng.integers(20, 100, rows)
+    temp_fah = 50 + 25 * np.sin(2 * np.pi * (days.dayofyear.to_numpy() - 100) / 365) + hours / 4
+    return pd.DataFrame({'location_name': LOCATION,
+                         'day': days.strftime('%m/%d/%Y'),
+                         'hour': [time(int(i)) for i in hours],
+                         'humidity': humidity,
+                         'temp_fah': np.round(temp_fah + rng.normal(0, 2, rows), 2),
+                         'condition': CONDITIONS[(humidity // 20 + hours // 12) % len(CONDITIONS)]})
+
+
+@pytest.fixture(scope='module')
+def trained():
+    """
+    Small forests fitted the way `train_location` fits them: the regressor on scaled features,
+    the classifier on raw features.
+    """
+    data = frame()
+    X = frame_features(data)
+    scaler = StandardScaler().fit(X)
+    label_encoder = LabelEncoder()
+    y_cond = label_encoder.fit_transform(data['condition'])
+    regressor = RandomForestRegressor(n_estimators=12, max_depth=8, random_state=42)
+    regressor.fit(scaler.transform(X), data['temp_fah'])
+    classifier = RandomForestClassifier(n_estimators=12, random_state=42).fit(X, y_cond)
+    return data, LocationModels(regressor, classifier, scaler, label_encoder)
+
+
+def test_flat_forest_matches_sklearn(trained):
+    data, models = trained
+    X = frame_features(frame(100, seed=1))
+    X_scaled = models.scaler.transform(X)
+    regressor, classifier = FlatForest(models.regressor), FlatForest(models.classifier)
+    assert np.allclose([regressor.predict(i) for i in X_scaled], models.regressor.predict(X_scaled))
+    assert np.array_equal([classifier.predict(i) for i in X], models.classifier.predict(X))
+
+
+def test_registry_predict_matches_sklearn(trained, tmp_path):
+    data, models = trained
+    ModelRegistry(tmp_path).save(LOCATION, 'fingerprint', models)
+    registry = ModelRegistry(tmp_path)
+    samples = frame(50, seed=2)
+    X = frame_features(samples)
+    expected_temp = models.regressor.predict(models.scaler.transform(X))
+    expected_cond = models.label_encoder.inverse_transform(models.classifier.predict(X))
+    for (_, row), temp_fah, condition in zip(samples.iterrows(), expected_temp, expected_cond):
+        prediction = registry.predict(LOCATION, row['hour'], row['day'], row['humidity'])
+        assert prediction.temp_fah == pytest.approx(temp_fah)
+        assert prediction.condition == condition
+    assert registry.predict(LOCATION, '13:00', date(2023, 7, 4), 55).condition in CONDITIONS
+
+
+def test_unchanged_locations_are_not_retrained(trained, tmp_path, capsys):
+    data, models = trained
+    fingerprint = ModelRegistry.fingerprint(data)
+    assert ModelRegistry.fingerprint(data.sample(frac=1, random_state=0)) == fingerprint
+    ModelRegistry(tmp_path).save(LOCATION, fingerprint, models)
+
+    registry = ModelRegistry(tmp_path)
+    assert registry.is_current(LOCATION, fingerprint)
+    assert not registry.is_current(LOCATION, ModelRegistry.fingerprint(data.assign(humidity=data['humidity'] + 1)))
+
+    #**Nothing is left to train, so no worker pool is started
+    database = SimpleNamespace(database=SimpleNamespace(frame=data))
+    WeatherManager(database, cpu_budget=1, registry=registry)
+    assert '1 location(s) unchanged, skipping retraining.' in capsys.readouterr().out
@@ -0,0 +1,66 @@
+import pytest
+
+import weather_data
+from weather_data import ConditionInfo, WeatherConditons
+
+TTL = WeatherConditons.CACHE_TTL
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(weather_data.time, 'time', lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def scrapes(monkeypatch, tmp_path):
+    """
+    Count scrapes, and keep the conditions cache in a temporary folder.
+    """
+    scraped = []
+
+    def fetch_conditions(self):
+        scraped.append(self)
+        return [ConditionInfo('01d', f'Clear Sky {len(scraped)}')]
+
+    init = WeatherConditons.__init__
+
+    def __init__(self):
+        init(self)
+        self.cache_path = tmp_path / 'conditions_cache.json'
+
+    monkeypatch.setattr(WeatherConditons, 'fetch_conditions', fetch_conditions)
+    monkeypatch.setattr(WeatherConditons, '__init__', __init__)
+    monkeypatch.setattr(weather_data, '_matcher', None)
+    return scraped
+
+
+def test_load_conditions_scrapes_only_when_the_cache_is_stale(clock, scrapes):
+    conditions = WeatherConditons()
+    assert conditions.load_conditions()[0].description == 'Clear Sky 1'
+    clock[0] += TTL - 1
+    assert conditions.load_conditions()[0].description == 'Clear Sky 1'
+    assert conditions.load_conditions(refresh=True)[0].description == 'Clear Sky 2'
+    clock[0] += TTL
+    assert conditions.load_conditions()[0].description == 'Clear Sky 3'
+    assert len(scrapes) == 3
+
+
+def test_matcher_is_rebuilt_when_its_conditions_expire(clock, scrapes):
+    matcher = WeatherConditons.matcher()
+    assert matcher.choices == ['Clear Sky 1']
+    clock[0] += TTL - 1
+    assert WeatherConditons.matcher() is matcher
+    clock[0] += 1
+    assert WeatherConditons.matcher().choices == ['Clear Sky 2']
+    assert len(scrapes) == 2
+
+
+def test_matcher_expires_with_the_cache_it_was_built_from(clock, scrapes):
+    WeatherConditons().load_conditions()
+    clock[0] += TTL - 10
+    matcher = WeatherConditons.matcher()
+    assert matcher.choices == ['Clear Sky 1']
+    clock[0] += 10
+    assert WeatherConditons.matcher().choices == ['Clear Sky 2']
@@ -0,0 +1,38 @@
+import asyncio
+import threading
+
+from weather_data import ConfigInfo, WeatherConditons, WeatherForecast
+
+CONFIG = ConfigInfo('weather', 'forecast', 'geo', 'localhost', 'weather', 'user', 'password')
+
+
+def test_fetch_many_is_not_capped_by_the_shared_session(stub_server, monkeypatch):
+    monkeypatch.setattr(WeatherConditons, 'match_record', staticmethod(lambda item, matcher=None: {}))
+    #**Every request waits until six are in flight at once; the shared session allows only four
+    barrier = threading.Barrier(6, timeout=5)
+
+    def respond(path, query):
+        try:
+            barrier.wait()
+        except threading.BrokenBarrierError:
+            return 400, {}, {}
+        return 200, {}, {'place': query['location']}
+
+    server = stub_server(respond)
+
+    class Forecast(WeatherForecast):
+        def full_weather_data(self):
+            self.base_url = server.url
+            return self.get_weather()
+
+        @staticmethod
+        def to_records(data):
+            return [data]
+
+    async def fetch(places):
+        return [i async for i in Forecast.fetch_many(places, concurrency=6, persist=None, config=CONFIG)]
+
+    places = [f'City {i}' for i in range(6)]
+    results = asyncio.run(fetch(places))
+    assert [i.error for i in results] == [None] * 6
+    assert sorted(i.data[0]['place'] for i in results) == places
@@ -0,0 +1,70 @@
+import time
+from email.utils import formatdate
+
+import pytest
+
+import weather_session
+from weather_session import RetryPolicy, WeatherSession
+
+
+@pytest.fixture
+def delays(monkeypatch):
+    waited = []
+    monkeypatch.setattr(weather_session.time, 'sleep', waited.append)
+    return waited
+
+
+def scripted(*responses):
+    """
+    Answer with `responses` in order, then keep repeating the last one.
+    """
+    queue = list(responses)
+    return lambda path, query: queue.pop(0) if len(queue) > 1 else queue[0]
+
+
+def test_retries_503_then_returns_success(stub_server, delays):
+    server = stub_server(scripted((503, {}, ''), (503, {}, ''), (200, {}, {'ok': True})))
+    with WeatherSession(policy=RetryPolicy(backoff=0.5)) as session:
+        response = session.get(server.url + '/forecast', params={'q': 'Boston'})
+    assert response.status_code == 200 and response.json() == {'ok': True}
+    assert len(server.requests) == 3
+    assert server.requests[-1] == ('/forecast', {'q': 'Boston'})
+    assert delays == [0.5, 1.0]
+
+
+def test_retry_after_seconds_on_429(stub_server, delays):
+    server = stub_server(scripted((429, {'Retry-After': '3'}, ''), (200, {}, '')))
+    with WeatherSession() as session:
+        assert session.get(server.url).status_code == 200
+    assert delays == [3.0]
+
+
+def test_retry_after_http_date(stub_server, delays):
+    retry_at = formatdate(time.time() + 10, usegmt=True)
+    server = stub_server(scripted((503, {'Retry-After': retry_at}, ''), (200, {}, '')))
+    with WeatherSession() as session:
+        assert session.get(server.url).status_code == 200
+    #**The date has a one-second resolution
+    assert len(delays) == 1 and 8.5 < delays[0] <= 10
+
+
+def test_delays_are_capped_by_max_backoff(stub_server, delays):
+    server = stub_server(scripted((429, {'Retry-After': '120'}, ''), (503, {}, ''), (503, {}, ''), (200, {}, '')))
+    with WeatherSession(policy=RetryPolicy(backoff=4, max_backoff=6)) as session:
+        assert session.get(server.url).status_code == 200
+    assert delays == [6, 6, 6]
+
+
+def test_final_retryable_response_is_passed_through(stub_server, delays):
+    server = stub_server(scripted((503, {}, 'busy')))
+    with WeatherSession(policy=RetryPolicy(retries=2, backoff=0.1)) as session:
+        response = session.get(server.url)
+    assert response.status_code == 503 and response.text == 'busy'
+    assert len(server.requests) == 3 and len(delays) == 2
+
+
+def test_other_errors_are_not_retried(stub_server, delays):
+    server = stub_server(scripted((404, {}, 'missing'), (200, {}, '')))
+    with WeatherSession() as session:
+        assert session.get(server.url).status_code == 404
+    assert len(server.requests) == 1 and delays == []
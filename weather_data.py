@@ -1,20 +1,32 @@
+from __future__ import annotations
+
 import json
 import os
-import socket
+import re
 import sys
-from base64 import b64encode
+import tempfile
+import textwrap
+import threading
+import time
 from collections import OrderedDict
-from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from functools import cached_property, lru_cache
 from pathlib import Path
-from typing import NamedTuple
+from typing import TYPE_CHECKING, NamedTuple
 
 import requests
-from bs4 import BeautifulSoup
-from geocoder import ip
-from rapidfuzz import fuzz, process
 
 from emojis import simple_weather_emojis as e
-from weather_db_connect import ForecastDB
+from geocode_cache import get_geocoder
+from icon_store import IconStore
+from weather_session import WeatherSession, get_session
+
+if TYPE_CHECKING:
+    import numpy as np
+
+#**numpy, bs4, rapidfuzz, psycopg (ForecastDB) and the history store are imported
+#**by the features that need them, so the simple report only loads requests
 
 WIND_DIRECTIONS = {
     'N': 'North',
@@ -48,10 +60,10 @@ class LocationInfo(NamedTuple):
     arg1: float=None
     arg2: float=None
 
-class HourlyData(NamedTuple):
-    date: str
-    time: str
-    temp: str
+class ForecastResult(NamedTuple):
+    place: str
+    data: list=None
+    error: BaseException=None
 
 @dataclass
 class ConditionInfo:
@@ -65,62 +77,158 @@ class ParsedDate:
     day: str
 
 
+@dataclass
+class ForecastFrame:
+    location: str
+    coordinates: LocationInfo
+    dates: list
+    min_temp: np.ndarray     # (days, 2) Celsius, Fahrenheit
+    max_temp: np.ndarray     # (days, 2) Celsius, Fahrenheit
+    day_index: np.ndarray    # Hours of day `i` are [day_index[i], day_index[i + 1])
+    hours: list
+    temperature: np.ndarray  # (hours, 2) Celsius, Fahrenheit
+    humidity: np.ndarray
+    conditions: list
+
+    def __len__(self):
+        return len(self.dates)
+
+
 @dataclass
 class Args:
     arg1: str=None
     arg2: str=None
     arg3: str=None
 
+class JSONStreamWriter:
+    def __init__(self, file_name, compact=False):
+        """
+        Write a JSON file in `data_files/` incrementally and atomically.
+
+        Records passed to `write` are encoded and written to a temporary file right away,
+        as elements of a JSON array. The temporary file replaces the target only when the
+        `with` block exits without error, so readers never see a partial file.
+
+        Parameters:
+            - `file_name` (str): The file name inside `data_files/`. '.json' is appended if missing.
+            - `compact` (bool): Write without indentation or spaces. Defaults to False.
+        """
+        file_name = file_name if file_name.endswith('.json') else f'{file_name}.json'
+        self.path = Path(__file__).parent.absolute() / 'data_files' / file_name
+        self.compact = compact
+        self.count = 0
+        self._file = None
+        self._tmp = None
+        self._dumped = False
+
+    def __enter__(self):
+        fd, self._tmp = tempfile.mkstemp(dir=self.path.parent, prefix=f'.{self.path.name}.', suffix='.tmp')
+        self._file = os.fdopen(fd, 'w', encoding='utf-8')
+        return self
+
+    def __exit__(self, exc_type, *_):
+        try:
+            if exc_type is None:
+                if not self.count and not self._dumped:
+                    self._file.write('[]')
+                elif self.count:
+                    self._file.write(']' if self.compact else '\n]')
+                self._file.close()
+                os.replace(self._tmp, self.path)
+        finally:
+            if not self._file.closed:
+                self._file.close()
+            if os.path.exists(self._tmp):
+                os.unlink(self._tmp)
+
+    def _encode(self, obj):
+        if self.compact:
+            return json.dumps(obj, separators=(',', ':'))
+        return json.dumps(obj, indent=2)
+
+    def write(self, record):
+        if self._dumped:
+            raise ValueError("Cannot write records after dump().")
+        if self.compact:
+            self._file.write(('[' if not self.count else ',') + self._encode(record))
+        else:
+            self._file.write(('[\n' if not self.count else ',\n') + textwrap.indent(self._encode(record), '  '))
+        self.count += 1
+        return record
+
+    def write_many(self, records):
+        for record in records:
+            self.write(record)
+        return self.count
+
+    def dump(self, obj):
+        """
+        Write a whole (non-streamed) object as the file content.
+        """
+        if self.count or self._dumped:
+            raise ValueError("The file already has content.")
+        self._file.write(self._encode(obj))
+        self._dumped = True
+
+@lru_cache(maxsize=None)
+def load_config() -> ConfigInfo:
+    """
+    Read `config.json` once and return it as a `ConfigInfo`.
+    """
+    return ConfigInfo(*WeatherForecast.get_config().values())
+
 class SimpleWeather: #! Turn into a simple GUI
-    def __init__(self, place=None):
+    def __init__(self, place=None, config=None, session=None):
+        """
+        Initialize the SimpleWeather class. Nothing is fetched until a report is requested.
+
+        Parameters:
+            - `place` (str, optional): The location for which to retrieve weather information. Defaults to None.
+            - `config` (ConfigInfo, optional): The API keys and database settings. Defaults to `load_config()`.
+            - `session` (WeatherSession, optional): The HTTP transport. Defaults to `get_session()`.
+        """
         self.place = place
-        self.current_location = self.get_location()
+        if config is not None:
+            self.config = config
+        if session is not None:
+            self.session = session
         self.base_url = 'http://api.weatherapi.com/v1/current.json'
-        self.query_params = {'key': config.weather_api, 'q': self.place or self.get_location()}
 
-    @staticmethod
-    def get_ip_address():
-        try:
-            ip_address = ip('me').ip
-            return ip_address
-        
-        except socket.error as e:
-            s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            s.connect(('8.8.8.8', 80))
-            ip_address = s.getsockname()[0]
-            return ip_address
-        
-        except Exception as e:
-            print("Error: Failed to fetch IP address.", e)
-            return None
-            
+    @cached_property
+    def config(self) -> ConfigInfo:
+        return load_config()
 
-    def get_location(self):
+    @cached_property
+    def session(self) -> WeatherSession:
+        return get_session()
+
+    @cached_property
+    def current_location(self):
+        #**Resolved on first use only
+        return self.get_location()
+
+    @cached_property
+    def query_params(self):
+        return {'key': self.config.weather_api, 'q': self.place or self.current_location}
+
+    def current_geolocation(self):
+        #**Resolved once per day through the shared geocoding cache
         try:
-            ip_address = self.get_ip_address
-            response = requests.get('https://ipinfo.io/', params={
-                'token': config.geo_api,
-                'ip': ip_address,
-                'contentType': 'json'
-            }).json()
-            city = response.get('city')
-            region = response.get('region')
-            return city or region or 'Unknown'
-        except requests.RequestException as e:
+            return get_geocoder().current(self.config.geo_api)
+        except (requests.RequestException, ValueError) as e:
             print("Error: Failed to fetch location data.", e)
             raise SystemExit
 
+    def get_location(self):
+        return self.current_geolocation().name
+
     def get_weather(self):
         try:
-            response = requests.get(self.base_url, params=self.query_params)
+            response = self.session.get(self.base_url, params=self.query_params)
             response.raise_for_status()
         except requests.RequestException as e:
             print("Error: Failed to fetch weather data.", e)
             raise SystemExit
-
-        if response.status_code == 429:
-            print("Error: Too many requests. Please try again later.")
-            return self.get_weather()
         return response.json()
 
     def get_weather_data(self):
@@ -193,42 +301,44 @@ class SimpleWeather: #! Turn into a simple GUI
             ''')
     
     @staticmethod
-    def dump_json(data, file_name=None):
+    def dump_json(data, file_name=None, compact=False):
         """
         Dump the data into a JSON file.
 
         Parameters:
             - `data` (list): The data to be dumped into the JSON file.
+            - `compact` (bool): Write without indentation. Defaults to False.
         """
-        json_file = Path(__file__).parent.absolute() / 'data_files' / file_name
-        if os.path.isfile(json_file) or not os.path.isfile(json_file):
-            try:
-                if file_name:
-                    if not file_name.endswith('.json'):
-                        with open(f'{json_file}.json', 'w') as f:
-                            json.dump(data, f, indent=2)
-                    else:
-                        with open(json_file, 'w') as f:
-                            json.dump(data, f, indent=2)
-            except OSError as e:
-                print("Error: Failed to write JSON data.", e)
-                raise SystemExit
+        try:
+            with JSONStreamWriter(file_name, compact=compact) as writer:
+                if isinstance(data, list):
+                    writer.write_many(data)
+                else:
+                    writer.dump(data)
+        except OSError as e:
+            print("Error: Failed to write JSON data.", e)
+            raise SystemExit
 
 class WeatherForecast(SimpleWeather):
-    def __init__(self, place=None):
+    def __init__(self, place=None, config=None, session=None):
         """
-        Initialize the WeatherForecast class.
+        Initialize the WeatherForecast class. Nothing is fetched until the forecast is requested.
 
         Parameters:
             - `place` (str, optional): The location for which to retrieve weather information. Defaults to None.
+            - `config` (ConfigInfo, optional): The API keys and database settings. Defaults to `load_config()`.
+            - `session` (WeatherSession, optional): The HTTP transport. Defaults to `get_session()`.
         """
-        super().__init__(place)
+        super().__init__(place, config, session)
         self.base_url = 'https://weather.visualcrossing.com/VisualCrossingWebServices/rest/services/timeline'
-        self.query_params = {
-            'key': config.forecast_api,
+
+    @cached_property
+    def query_params(self):
+        return {
+            'key': self.config.forecast_api,
             'contentType': 'json',
             'unitGroup': 'metric',
-            'location': self.place or self.get_location(),
+            'location': self.place or self.current_location,
         }
     
     @staticmethod
@@ -237,6 +347,16 @@ class WeatherForecast(SimpleWeather):
     
     
     def get_coordinates(self):
+        """
+        Resolve the coordinates of the place, or of the current location, through the
+        geocoding cache. Only if the place cannot be geocoded is the forecast downloaded.
+
+        Returns:
+            - `LocationInfo`: The longitude (`arg1`) and latitude (`arg2`).
+        """
+        location = get_geocoder().place(self.place) if self.place else self.current_geolocation()
+        if location is not None and location.latitude is not None:
+            return LocationInfo(arg1=location.longitude, arg2=location.latitude)
         data = self.get_weather()
         if not data:
             return None
@@ -250,11 +370,8 @@ class WeatherForecast(SimpleWeather):
             - `dict`: The JSON response containing the weather data.
         """
         try:
-            response = requests.get(self.base_url, params=self.query_params)
+            response = self.session.get(self.base_url, params=self.query_params)
             response.raise_for_status()
-            if response.status_code == 429:
-                print("Error: Too many requests. Please try again later.")
-                return None
             return response.json()
         except requests.RequestException as e:
             print("Error: Failed to fetch weather data.", e)
@@ -264,123 +381,446 @@ class WeatherForecast(SimpleWeather):
         """
         Extract the full weather data for the forecast.
 
+        The response is read in a single pass into flat per-field arrays. Days may have
+        any number of hours (e.g. 23 or 25 on DST changes), and Celsius is converted to
+        Fahrenheit once for the whole forecast.
+
         Returns:
-            - `list`: A list containing the full weather data.
+            - `ForecastFrame`: The columnar forecast data, or None if no data was returned.
         """
+        import numpy as np
+
         data = self.get_weather()
         if not data:
-            data = []
-        full_data = []
-        
-        coordinates = LocationInfo(arg1=data['longitude'], arg2=data['latitude'])
-        location_name = data['resolvedAddress']
-        both_degrees = lambda c_temp: (c_temp, round((c_temp * 9 / 5) + 32, 2))  # (Celsius, Fahrenheit)
-        
-        min_temp = [LocationInfo(*both_degrees(data['days'][i]['tempmin'])) for i in range(min(15, len(data['days'])))]
-        max_temp = [LocationInfo(*both_degrees(data['days'][i]['tempmax'])) for i in range(min(15, len(data['days'])))]
+            return None
         
-        for i in range(min(15, len(data['days']))):
-            day_data = data['days'][i]
+        dates, min_temp, max_temp, day_index = [], [], [], [0]
+        hours, temperature, humidity, conditions = [], [], [], []
+        for day_data in data['days'][:15]:
             date_ = ParsedDate(*day_data['datetime'].split('-'))
-            date = f'{date_.month}/{date_.day}/{date_.year}'
-            hours = [day_data['hours'][idx]['datetime'] for idx in range(24)]
-            humidity = [round(day_data['hours'][idx]['humidity']) for idx in range(24)]
-            conditions = [[day_data['hours'][idx]['conditions'], ''] for idx in range(24)]
-            hourly_temp = [LocationInfo(*both_degrees(day_data['hours'][idx]['temp'])) for idx in range(24)]
-            all_data = zip(hours, hourly_temp, humidity, conditions)
-            day_full_data = list(all_data)
-            full_data.append((location_name, coordinates, date, min_temp, max_temp, day_full_data))
-        return full_data
-
-    def data_to_json(self, data=None):
-        data = self.full_weather_data() if not data else data
-        clean_data = []
-        conditions = set()
-        for _, element in enumerate(data):
+            dates.append(f'{date_.month}/{date_.day}/{date_.year}')
+            min_temp.append(day_data['tempmin'])
+            max_temp.append(day_data['tempmax'])
+            for hour in day_data.get('hours', []):
+                hours.append(hour['datetime'])
+                temperature.append(hour['temp'])
+                humidity.append(hour['humidity'])
+                conditions.append(hour['conditions'])
+            day_index.append(len(hours))
+        
+        both_degrees = lambda c_temp: np.column_stack((c_temp, np.round(c_temp * 9 / 5 + 32, 2)))  # (Celsius, Fahrenheit)
+        return ForecastFrame(
+            location=data['resolvedAddress'],
+            coordinates=LocationInfo(arg1=data['longitude'], arg2=data['latitude']),
+            dates=dates,
+            min_temp=both_degrees(np.array(min_temp, dtype=np.float64)),
+            max_temp=both_degrees(np.array(max_temp, dtype=np.float64)),
+            day_index=np.array(day_index, dtype=np.int32),
+            hours=hours,
+            temperature=both_degrees(np.array(temperature, dtype=np.float64)),
+            humidity=np.rint(np.array(humidity, dtype=np.float64)).astype(np.int16),
+            conditions=conditions)
+
+    @staticmethod
+    def to_records(data):
+        """
+        Convert the parsed forecast into JSON-ready records, one per day.
+
+        Parameters:
+            - `data` (ForecastFrame): The output of `full_weather_data`.
+
+        Returns:
+            - `list`: A list of day records with their hourly data.
+        """
+        return list(WeatherForecast.iter_records(data))
+
+    @staticmethod
+    def iter_records(data):
+        """
+        Yield the JSON-ready day records of `data` one at a time.
+        """
+        min_temp, max_temp = data.min_temp.tolist(), data.max_temp.tolist()
+        temperature, humidity = data.temperature.tolist(), data.humidity.tolist()
+        day_index = data.day_index.tolist()
+        for i, date in enumerate(data.dates):
             item = {
-                'location': element[0],
-                'coordinates': {'longitude': element[1].arg1,
-                                'latitude': element[1].arg2},
+                'location': data.location,
+                'coordinates': {'longitude': data.coordinates.arg1,
+                                'latitude': data.coordinates.arg2},
                 
-                'day': {'date': element[2],
-                        'min_temp': {'Celcius':element[3][_].arg1,
-                                    'Fahrenheit':element[3][_].arg2},
-                        'max_temp': {'Celcius':element[4][_].arg1,
-                                    'Fahrenheit':element[4][_].arg2}}
+                'day': {'date': date,
+                        'min_temp': {'Celcius':min_temp[i][0],
+                                    'Fahrenheit':min_temp[i][1]},
+                        'max_temp': {'Celcius':max_temp[i][0],
+                                    'Fahrenheit':max_temp[i][1]}}
                         }
             hourly_data = []
-            for i in element[5]:
-                conditions.add(i[3][0])
+            for j in range(day_index[i], day_index[i + 1]):
                 hourly_item = {
-                    'hour': i[0],
-                    'temperature': {'Celcius': i[1].arg1,
-                                    'Fahrenheit':i[1].arg2},
-                    'humidity': i[2],
-                    'conditions': i[3][0],
+                    'hour': data.hours[j],
+                    'temperature': {'Celcius': temperature[j][0],
+                                    'Fahrenheit':temperature[j][1]},
+                    'humidity': humidity[j],
+                    'conditions': data.conditions[j],
                     'emoji': '' 
                 }
                 hourly_data.append(hourly_item)
             item['day']['hourly_data'] = hourly_data
-            clean_data.append(item)
+            yield item
+
+    def data_to_json(self, data=None, compact=False):
+        """
+        Write the forecast to `data_files/Forecast_data.json`.
+
+        Each day record has its conditions matched and its icons attached, and is then
+        written right away. The file is replaced once, atomically, at the end of the run.
+
+        Parameters:
+            - `data` (ForecastFrame, optional): The parsed forecast. Fetched if not given.
+            - `compact` (bool): Write without indentation. Defaults to False.
+
+        Returns:
+            - `int`: The number of day records written.
+        """
+        data = self.full_weather_data() if not data else data
+        records = WeatherIcons.modify_icons(WeatherConditons.modify_condition(WeatherForecast.iter_records(data)))
         try:
-            SimpleWeather.dump_json(clean_data, file_name='Forecast_data.json')
+            with JSONStreamWriter('Forecast_data.json', compact=compact) as writer:
+                return writer.write_many(records)
         except OSError as e:
             print("Error: Failed to write JSON data.", e)
             raise SystemExit
-        clean_data = WeatherConditons.modify_condition(clean_data)
-        return clean_data
+
+    @staticmethod
+    def save_forecast(place, records):
+        """
+        Persist the forecast records of a single location to `data_files/forecasts/`.
+
+        The records have the same shape as `Forecast_data.json`: conditions matched and
+        icon codes set by `WeatherConditons.match_record`. The icon images are not
+        downloaded here. `data_to_json` stores them and rewrites `weather_conditions.json`.
+
+        Parameters:
+            - `place` (str): The requested location.
+            - `records` (list): The day records returned by `to_records`.
+        """
+        name = re.sub(r'\W+', '_', records[0]['location'] if records else place).strip('_') or 'Unknown'
+        (Path(__file__).parent.absolute() / 'data_files' / 'forecasts').mkdir(exist_ok=True)
+        SimpleWeather.dump_json(records, file_name=f'forecasts/{name}.json')
+
+    @classmethod
+    async def fetch_many(cls, places, concurrency=8, persist=save_forecast, config=None):
+        """
+        Fetch, parse and persist the forecasts of many locations concurrently.
+
+        At most `concurrency` locations are in flight at any time. The batch uses its own
+        `WeatherSession` with `concurrency` connections and requests per host, so the limit
+        of the shared session does not cap it. Results are yielded as soon as each location
+        finishes, and a failing location is reported in its own `ForecastResult` instead of
+        stopping the batch.
+
+        Parameters:
+            - `places` (iterable): The locations to fetch.
+            - `concurrency` (int): Maximum number of locations processed at once. Defaults to 8.
+            - `persist` (callable, optional): Called with `(place, records)` for every successful
+            location. Defaults to `save_forecast`; pass None to skip persisting.
+            - `config` (ConfigInfo, optional): Shared by every client. Defaults to `load_config()`.
+
+        Yields:
+            - `ForecastResult`: The place with either its records or the error raised.
+        """
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        def fetch(place):
+            records = cls.to_records(cls(place, config=config, session=session).full_weather_data())
+            for record in records:
+                WeatherConditons.match_record(record)
+            if persist is not None:
+                persist(place, records)
+            return records
+
+        async def run(place):
+            async with semaphore:
+                try:
+                    records = await loop.run_in_executor(executor, fetch, place)
+                except (Exception, SystemExit) as e:
+                    return ForecastResult(place, error=e)
+            return ForecastResult(place, data=records)
+
+        session = WeatherSession(pool_size=concurrency, host_limit=concurrency)
+        executor = ThreadPoolExecutor(max_workers=concurrency)
+        tasks = [asyncio.create_task(run(place)) for place in places]
+        try:
+            for task in asyncio.as_completed(tasks):
+                yield await task
+        finally:
+            for task in tasks:
+                task.cancel()
+            #**Never block the event loop on downloads still in flight when the consumer stops early
+            executor.shutdown(wait=False, cancel_futures=True)
+            session.close()
 
 class HistoricalData:
-    def __init__(self):
-        self.coordinates = WeatherForecast().get_coordinates()
-        self.base_url = 'https://archive-api.open-meteo.com/v1/archive?'\
-                        f'latitude={self.coordinates.arg2}&longitude={self.coordinates.arg1}&'\
-                        'start_date=2020-12-31&end_date=2023-07-01&'\
-                        'hourly=temperature_2m&temperature_unit=fahrenheit&'\
-                        'windspeed_unit=mph'
-
-    def parse_history(self):
+    DEFAULT_START = '2020-12-31'
+    CHUNK_DAYS = 180
+
+    def __init__(self, place=None, start_date=None, end_date=None, chunk_days=CHUNK_DAYS, max_workers=4, config=None):
+        """
+        Hourly temperature history of a location, kept in a columnar `HistoryStore`.
+
+        Parameters:
+            - `place` (str, optional): The location. Defaults to the current location.
+            - `start_date` (str, optional): First day to keep, 'YYYY-MM-DD'. Defaults to `DEFAULT_START`.
+            - `end_date` (str, optional): Last day to keep, 'YYYY-MM-DD'. Defaults to today.
+            - `chunk_days` (int): Days fetched per request. Defaults to `CHUNK_DAYS`.
+            - `max_workers` (int): Chunks fetched at once. Defaults to 4.
+            - `config` (ConfigInfo, optional): The API keys. Defaults to `load_config()`.
+        """
+        import numpy as np
+
+        self.place = place
+        self.forecast = WeatherForecast(place, config)
+        self.start_date = np.datetime64(start_date or self.DEFAULT_START, 'D')
+        self.end_date = np.datetime64(end_date, 'D') if end_date else np.datetime64('today', 'D')
+        self.chunk_days = chunk_days
+        self.max_workers = max_workers
+        self.base_url = 'https://archive-api.open-meteo.com/v1/archive'
+        self.legacy_path = Path(__file__).parent.absolute() / 'data_files' / 'History_data.json'
+
+    @cached_property
+    def coordinates(self):
+        return self.forecast.get_coordinates()
+
+    @cached_property
+    def store(self):
+        from history_store import HistoryStore
+
+        return HistoryStore(self.place or self.forecast.current_location)
+
+    def query_params(self, start_date, end_date):
+        return {'latitude': self.coordinates.arg2,
+                'longitude': self.coordinates.arg1,
+                'start_date': str(start_date),
+                'end_date': str(end_date),
+                'hourly': 'temperature_2m',
+                'temperature_unit': 'fahrenheit',
+                'windspeed_unit': 'mph'}
+
+    def parse_history(self, start_date=None, end_date=None):
         try:
-            response = requests.get(self.base_url)
+            start_date = self.start_date if start_date is None else start_date
+            end_date = self.end_date if end_date is None else end_date
+            response = get_session().get(self.base_url, params=self.query_params(start_date, end_date))
             response.raise_for_status()
         except requests.RequestException as e:
             print("Error: Failed to fetch weather data.", e)
             raise SystemExit
-
-        if response.status_code == 429:
-            print("Error: Too many requests. Please try again later.")
         return response.json()
+
+    def chunks(self, start_date, end_date):
+        """
+        Split a date range into windows of at most `chunk_days` days, in order.
+        """
+        import numpy as np
+
+        step = np.timedelta64(self.chunk_days, 'D')
+        starts = np.arange(start_date, end_date + 1, step)
+        return [(i, min(i + step - 1, end_date)) for i in starts]
     
-    def get_history_data(self):
-        data = self.parse_history()
+    def get_history_data(self, start_date=None, end_date=None):
+        """
+        Fetch the hourly history of a date range as columns.
+
+        Ranges longer than `chunk_days` are fetched as parallel requests and merged in
+        order. Trailing hours the archive has no reading for yet are dropped, so the next
+        sync fetches them again.
+
+        Parameters:
+            - `start_date`, `end_date` (np.datetime64, optional): The days to fetch, inclusive.
+            Default to the configured range.
+
+        Returns:
+            - `HistoryColumns`: Epoch hours (int32) and temperatures in Fahrenheit (float32),
+            or None if nothing was returned. Other missing readings are NaN.
+        """
+        import numpy as np
+
+        from history_store import HistoryColumns, HistoryStore
+
+        start_date = start_date if start_date is not None else self.start_date
+        end_date = end_date if end_date is not None else self.end_date
+        windows = self.chunks(start_date, end_date)
+        if not windows:
+            return None
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(windows))) as executor:
+            responses = list(executor.map(lambda i: self.parse_history(*i), windows))
         
+        data = [i['hourly'] for i in responses if i and 'hourly' in i]
         if not data:
             return None
         
-        data = data['hourly']
-        hourly_temp = data['temperature_2m']
-        date_and_time = [i.split('T') for i in data['time']]
-        modified_time = [[i[0], f'{i[1]}:00'] for i in date_and_time]
-        data_zipped = list(zip(hourly_temp, modified_time))
-        full_data = [HourlyData(date=i[1][0],time=i[1][-1],temp=i[0]) for i in data_zipped]
-        return full_data
+        hours = np.concatenate([HistoryStore.epoch_hours(i['time']) for i in data])
+        temperature = np.concatenate([np.array(i['temperature_2m'], dtype=np.float32) for i in data])
+        readings = np.flatnonzero(~np.isnan(temperature))
+        end = readings[-1] + 1 if len(readings) else 0
+        return HistoryColumns(hours[:end], temperature[:end])
     
-    def hourly_json(self, data):
-        json_hourly = OrderedDict()
-        for idx, item in enumerate(data, start=1):
-            date_key = f'Date: {item.date}'
-            if date_key not in json_hourly:
-                json_hourly[date_key] = OrderedDict()
-            json_hourly[date_key][f'Time {idx}'] = item.time
-            json_hourly[date_key][f'Temperature {idx}'] = item.temp
-        
-        SimpleWeather.dump_json(json_hourly, file_name='History_data')
-        
-        return json_hourly
+    def save_history(self, data):
+        """
+        Merge fetched history into the store.
+
+        Returns:
+            - `int`: The number of stored readings.
+        """
+        return self.store.write(data.hours, data.temperature)
+
+    def import_legacy(self):
+        """
+        Import `data_files/History_data.json`, the history file of earlier versions, once.
+
+        That file only ever held the current location and has no location name, so it is
+        read only when the current location is synced into an empty store. Readings outside
+        `start_date` and `end_date` are skipped, as are trailing hours without a reading.
+
+        Returns:
+            - `int`: The number of stored readings.
+        """
+        import numpy as np
+
+        try:
+            days = json.loads(self.legacy_path.read_text())
+        except (OSError, ValueError):
+            return len(self.store)
+
+        times, temperature = [], []
+        for day, readings in days.items():
+            date = day.removeprefix('Date: ')
+            for key, value in readings.items():
+                if key.startswith('Time '):
+                    times.append(f'{date}T{value[:5]}')
+                    temperature.append(readings.get(f'Temperature {key[5:]}'))
+        if not times:
+            return len(self.store)
+        hours = np.asarray(times, dtype='datetime64[h]')
+        temperature = np.array(temperature, dtype=np.float32)
+        keep = (hours >= self.start_date) & (hours < self.end_date + 1)
+        hours, temperature = hours[keep], temperature[keep]
+        readings = np.flatnonzero(~np.isnan(temperature))
+        end = readings[-1] + 1 if len(readings) else 0
+        if not end:
+            return len(self.store)
+        return self.store.write(hours[:end], temperature[:end])
+
+    def sync(self):
+        """
+        Fetch only the history missing from the store and merge it in.
+
+        The fetch resumes from the day of the first missing hour, or starts at
+        `start_date` for a new location. A nightly run downloads about one day. The first
+        sync of the current location starts from the legacy `History_data.json`, if any.
+        Fetched hours that are already stored are dropped, so the store only appends.
+
+        Returns:
+            - `int`: The number of stored readings.
+        """
+        import numpy as np
+
+        from history_store import HistoryColumns
+
+        if not self.place and not len(self.store):
+            self.import_legacy()
+        last_hour = self.store.last_hour()
+        start_date = self.start_date
+        if last_hour is not None:
+            start_date = max(start_date, (last_hour + 1).astype('datetime64[D]'))
+        if start_date > self.end_date:
+            return len(self.store)
+        data = self.get_history_data(start_date, self.end_date)
+        if data is not None and last_hour is not None:
+            new = data.hours > last_hour.astype(np.int32)
+            data = HistoryColumns(data.hours[new], data.temperature[new])
+        if data is None or not len(data):
+            return len(self.store)
+        return self.save_history(data)
+
+class ConditionMatcher:
+    def __init__(self, weather_conditions):
+        """
+        Map API condition strings to the closest scraped condition and its icon code.
+
+        The choice list is built once, and each distinct API condition is scored only the
+        first time it is seen. Hundreds of hourly records then cost one dictionary lookup each.
+
+        Parameters:
+            - `weather_conditions` (list): The `ConditionInfo` list from `WeatherConditons`.
+        """
+        self.weather_conditions = weather_conditions
+        self.choices = [i.description for i in weather_conditions]
+        self.icon_codes = {}
+        for i in weather_conditions:
+            self.icon_codes.setdefault(i.description, i.icon_code)
+        self.cache = {}
+
+    def match_many(self, conditions):
+        """
+        Match a batch of API conditions, scoring all unseen ones in a single `cdist` call.
+
+        Returns:
+            - `list`: A `(description, icon_code)` tuple for every condition, in order.
+        """
+        import numpy as np
+        from rapidfuzz import fuzz, process
+
+        unseen = [i for i in dict.fromkeys(conditions) if i not in self.cache]
+        if unseen:
+            scores = process.cdist([i.lower() for i in unseen], self.choices, scorer=fuzz.ratio, dtype=np.float64)
+            for condition, idx in zip(unseen, scores.argmax(axis=1)):
+                best_match = self.choices[idx]
+                self.cache[condition] = (best_match, self.icon_codes[best_match])
+        return [self.cache[i] for i in conditions]
+
+    def match(self, condition):
+        return self.match_many([condition])[0]
+
+_matcher = None
+_matcher_expires = 0.0
+_matcher_lock = threading.Lock()
 
 class WeatherConditons:
+    CACHE_VERSION = 1
+    CACHE_TTL = 7 * 24 * 3600  # One week, in seconds
+
     def __init__(self):
         self.scrape_url = 'https://openweathermap.org/weather-conditions'
+        self.cache_path = Path(__file__).parent.absolute() / 'data_files' / 'conditions_cache.json'
+        self.fallback_path = Path(__file__).parent.absolute() / 'data_files' / 'weather_conditions.json'
+
+    def fetch_conditions(self):
+        """
+        Download and parse the weather conditions table.
+
+        Raises:
+            - `requests.RequestException`: If the page could not be fetched.
+        """
+        from bs4 import BeautifulSoup
+
+        response = get_session().get(self.scrape_url)
+        response.raise_for_status()
+        soup = BeautifulSoup(response.text, 'html.parser')
+        tables = soup.find('table', class_='table')
+
+        data = []
+        for icon_table in tables.find_all('tr'):
+            cells = icon_table.find_all("td")
+            if len(cells) >= 3:
+                for _, _ in enumerate(cells):
+                    icon_code = cells[0].text.strip()[:3]
+                    description = cells[-1].text.strip().title()
+                data.append(ConditionInfo(icon_code=icon_code, description=description))
+        return data
 
     def scrape_data(self):
         """
@@ -390,24 +830,111 @@ class WeatherConditons:
             - `list`: A list containing the scraped weather conditions data.
         """
         try:
-            response = requests.get(self.scrape_url)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.text, 'html.parser')
-            tables = soup.find('table', class_='table')
-
-            data = []
-            for icon_table in tables.find_all('tr'):
-                cells = icon_table.find_all("td")
-                if len(cells) >= 3:
-                    for _, _ in enumerate(cells):
-                        icon_code = cells[0].text.strip()[:3]
-                        description = cells[-1].text.strip().title()
-                    data.append(ConditionInfo(icon_code=icon_code, description=description))
-            return data
+            return self.fetch_conditions()
         except requests.RequestException as e:
             print("Error: Failed to fetch weather conditions data.", e)
             raise SystemExit
+
+    def read_cache(self):
+        """
+        Read the cached conditions table.
+
+        Returns:
+            - `tuple | None`: `(fetched_at, conditions)`, or None if there is no cache
+            or it was written by another cache version.
+        """
+        try:
+            cache = json.loads(self.cache_path.read_text())
+        except (OSError, ValueError):
+            return None
+        if cache.get('version') != WeatherConditons.CACHE_VERSION:
+            return None
+        return cache['fetched_at'], [ConditionInfo(**i) for i in cache['conditions']]
+
+    def write_cache(self, data):
+        cache = {'version': WeatherConditons.CACHE_VERSION,
+                'fetched_at': time.time(),
+                'conditions': [asdict(i) for i in data]}
+        self.cache_path.write_text(json.dumps(cache, indent=2))
+
+    def read_fallback(self):
+        try:
+            conditions = json.loads(self.fallback_path.read_text())
+        except (OSError, ValueError):
+            return []
+        return [ConditionInfo(icon_code=i['Icon Code'], description=i['Description']) for i in conditions.values()]
+
+    def load_conditions(self, ttl=CACHE_TTL, refresh=False):
+        """
+        Return the weather conditions table, scraping it only when the local cache is stale.
+
+        Parameters:
+            - `ttl` (float): Maximum age of the cache in seconds. Defaults to one week.
+            - `refresh` (bool): Scrape even if the cache is still fresh. Defaults to False.
+
+        If scraping fails, the cache is used even when stale, and then
+        `data_files/weather_conditions.json`.
+
+        Returns:
+            - `list`: A list of `ConditionInfo`.
+        """
+        cache = self.read_cache()
+        if cache and not refresh and time.time() - cache[0] < ttl:
+            return cache[1]
+        try:
+            data = self.fetch_conditions()
+        except requests.RequestException as e:
+            data = cache[1] if cache else self.read_fallback()
+            if not data:
+                print("Error: Failed to fetch weather conditions data.", e)
+                raise SystemExit
+            print("Warning: Using offline weather conditions data.", e)
+            return data
+        try:
+            self.write_cache(data)
+        except OSError as e:
+            print("Warning: Failed to cache weather conditions data.", e)
+        return data
     
+    @staticmethod
+    def matcher():
+        """
+        Return the process-wide `ConditionMatcher`, built from `load_conditions`.
+
+        The matcher is rebuilt once the conditions it holds are older than `CACHE_TTL`,
+        so a long-running process picks up the refreshed table.
+        """
+        global _matcher, _matcher_expires
+        with _matcher_lock:
+            now = time.time()
+            if _matcher is None or now >= _matcher_expires:
+                conditions = WeatherConditons()
+                _matcher = ConditionMatcher(conditions.load_conditions())
+                cache = conditions.read_cache()
+                expires = (cache[0] if cache else now) + WeatherConditons.CACHE_TTL
+                #**A stale cache means scraping failed, so wait a full period before retrying
+                _matcher_expires = expires if expires > now else now + WeatherConditons.CACHE_TTL
+            return _matcher
+
+    @staticmethod
+    def match_record(item, matcher=None):
+        """
+        Replace the API conditions of one day record with the closest scraped conditions.
+
+        Every hour gets the matched description and its icon code (`emoji`).
+        Only the record is changed; no module state is touched.
+
+        Returns:
+            - `dict`: Maps each matched description to its icon code.
+        """
+        matcher = matcher or WeatherConditons.matcher()
+        hourly_data = item['day']['hourly_data']
+        matches = matcher.match_many([conditions['conditions'] for conditions in hourly_data])
+        for conditions, (best_match, icon_code) in zip(hourly_data, matches):
+            conditions['conditions'] = best_match
+            conditions['emoji'] = icon_code # '03d' --> b'PNG' through IconStore
+        return dict(matches)
+
     @staticmethod
     def modify_condition(data, condition=None):
         """
@@ -418,119 +945,120 @@ class WeatherConditons:
         between the two condition sets. The weather conditions in the data are updated with the best matching 
         condition, and the corresponding emoji is also modified accordingly.
 
+        Records are yielded one at a time as soon as their conditions are matched. `emoji_con`
+        and `missing_codes` are complete once the generator is exhausted.
+
         Parameters:
-            - `data` (list): The weather data to be modified.
+            - `data` (iterable): The day records to be modified.
             - `condition` (str, optional): The specific condition to modify. Defaults to None.
         """
         global emoji_con, missing_codes
         
-        weather_conditions = WeatherConditons().scrape_data()
-        unpacked = list(map(lambda i: [i.icon_code, i.description], weather_conditions))
+        matcher = WeatherConditons.matcher()
+        unpacked = list(map(lambda i: [i.icon_code, i.description], matcher.weather_conditions))
         emoji_con = {}
         for item in data:
-            hourly_data = item['day']['hourly_data']
-            for conditions in hourly_data:
-                condition = conditions['conditions']
-                best_match_ = process.extractOne(condition.lower(), list(map(lambda i: i.description, weather_conditions)), scorer=fuzz.ratio)
-                best_match = best_match_[0] if best_match_ else ""
-                conditions['conditions'] = best_match
-                conditions['emoji'] = list(filter(lambda i: i[0] if i[1]==best_match else '', unpacked))[0][0] # [['03d', 'Scattered Clouds']] --> '03d' --> b'PNG' (after using modify_emoji)
-                emoji_con[conditions['conditions']] = conditions['emoji']
+            emoji_con.update(WeatherConditons.match_record(item, matcher))
+            yield item
         missing_codes = {desc: icon for icon,desc in unpacked if icon not in emoji_con.values()}
-        try:
-            SimpleWeather.dump_json(data, file_name='Forecast_data.json')
-        except OSError as e:
-            print("Error: Failed to write JSON data.", e)
-            raise SystemExit
-        finally:
-            emoji_con = OrderedDict(sorted(emoji_con.items()))
-            WeatherIcons.modify_icons()
-        return
+        emoji_con = OrderedDict(sorted(emoji_con.items()))
 
 class WeatherIcons:
-    def __init__(self):
+    def __init__(self, store=None):
         self.base_url = 'https://openweathermap.org/img/wn/{}@2x.png'
+        self.store = store or IconStore()
     
     def parse_icon_url(self, icon_code):
         try:
-            response = requests.get(self.base_url.format(icon_code))
+            response = get_session().get(self.base_url.format(icon_code))
             response.raise_for_status()
             return response.content
         except requests.RequestException as e:
             print("Error: Failed to fetch icon data.", e)
             raise SystemExit
 
+    def fetch_icons(self, icon_codes, max_workers=8):
+        """
+        Make sure the day and night icons of every code are in the `IconStore`, downloading each one at most once.
+
+        Icons already in the store with a matching content hash are not downloaded.
+        The rest are downloaded in parallel and saved to the store.
+
+        Parameters:
+            - `icon_codes` (iterable): The day icon codes (e.g. '01d').
+            - `max_workers` (int): Maximum number of parallel downloads. Defaults to 8.
+
+        Returns:
+            - `dict`: Maps `(icon_code, 'day' | 'night')` to the sha256 digest of the icon.
+        """
+        icons, missing = {}, {}
+        for code in set(icon_codes):
+            for variant, url_code in (('day', code), ('night', code.replace('d', 'n'))):
+                if self.store.get(code, variant) is None:
+                    missing[(code, variant)] = url_code
+                else:
+                    icons[(code, variant)] = self.store.digest(code, variant)
+
+        if missing:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                downloads = dict(zip(missing, executor.map(self.parse_icon_url, missing.values())))
+            for (code, variant), png_bytes in downloads.items():
+                icons[(code, variant)] = self.store.put(code, variant, png_bytes)
+            self.store.save()
+        return icons
+
     @staticmethod
-    def modify_icons():
-        data = json.loads((Path(__file__).parent.absolute() / 'data_files' / 'Forecast_data.json').read_text())
-        path = Path(__file__).parent.absolute()
+    def modify_icons(data):
+        """
+        Make sure every condition icon is stored, yielding each day record unchanged.
+
+        Hourly records only keep their icon code (`emoji`). The bytes live once in the
+        `IconStore`. Once the records are exhausted, `data_files/weather_conditions.json`
+        is written with the icon code and the day and night content hashes of every condition.
+        """
         weather_icons = WeatherIcons()
-        all_codes = OrderedDict(sorted(emoji_con.items() | missing_codes.items(), key=lambda i: i[1]))
+        icons = weather_icons.fetch_icons(i.icon_code for i in WeatherConditons.matcher().weather_conditions)
 
-        for _, icon_code in emoji_con.items():
-            png_bytes = weather_icons.parse_icon_url(icon_code)
-            for item in data:
-                hourly_data = item['day']['hourly_data']
-                for conditions in hourly_data:
-                    if emoji_con.get(conditions['conditions']) == icon_code:
-                        conditions['emoji'] = {'Description': conditions['conditions'],
-                                                'Icon Code':icon_code,
-                                                'Decoded Bytes':b64encode(png_bytes).decode('utf-8')}
-                                                # encode back for bytes
-                    else:
-                        pass
+        yield from data
         
+        all_codes = OrderedDict(sorted(emoji_con.items() | missing_codes.items(), key=lambda i: i[1]))
         full_modifications = {}
         for condition, code in all_codes.items():
-            with open(path / 'icons' / f'{code}_day.png', 'wb') as day_file_:
-                with open(path / 'icons' / f'{code}_night.png', 'wb') as night_file_:
-                    day_bytes = weather_icons.parse_icon_url(code)
-                    night_bytes = weather_icons.parse_icon_url(code.replace('d', 'n'))
-                    day_file_.write(day_bytes)
-                    night_file_.write(night_bytes)
-                    full_modifications[condition] = {'Description': condition,
-                                                'Icon Code':code,
-                                                'Day Decoded Bytes':b64encode(day_bytes).decode('utf-8'),
-                                                'Night Decoded Bytes':b64encode(night_bytes).decode('utf-8')}
-        try:
-            SimpleWeather.dump_json(data, file_name='Forecast_data.json')
-            SimpleWeather.dump_json(full_modifications, file_name='weather_conditions')
-        except OSError as e:
-            print("Error: Failed to write JSON data.", e)
-            raise SystemExit
-        return full_modifications
+            full_modifications[condition] = {'Description': condition,
+                                        'Icon Code':code,
+                                        'Day Icon':icons[(code, 'day')],
+                                        'Night Icon':icons[(code, 'night')]}
+        SimpleWeather.dump_json(full_modifications, file_name='weather_conditions')
 
 
 def main():
-    global config
-    
-    config = ConfigInfo(*WeatherForecast.get_config().values())
+    config = load_config()
     
     def get_forecast(place):
-        forecast = WeatherForecast(place)
-        forecast.full_weather_data()
+        from weather_db_connect import ForecastDB
+
+        forecast = WeatherForecast(place, config)
         forecast.data_to_json() # Full JSON forecast data
         sql_params = map(lambda i: getattr(config, i), ['host', 'database', 'username', 'password'])
-        ForecastDB(sql_params)
+        with ForecastDB(sql_params) as db:
+            db.refresh()
     
-    def get_history():
-        history = HistoricalData()
-        hist_data = history.get_history_data()
-        history.hourly_json(hist_data)
+    def get_history(place):
+        HistoricalData(place, config=config).sync()
 
     try:
         simple_weather = input("\nWould you like a simple weather report? (y/n): ").lower()
         place = input("Enter a location (leave empty for current location): ")
         if simple_weather in ['no', 'n']:
             get_forecast(place)
-            get_history()
+            get_history(place)
         else:
-            SimpleWeather(place).display_weather_report()
+            SimpleWeather(place, config).display_weather_report()
     except KeyboardInterrupt:
         try:
             again = input("\nWould you like to try again?\nEnter a location (leave empty for current location):")
             get_forecast(again)
-            get_history()
+            get_history(again)
         except:
             print('\nProgram Terminated')
             sys.exit(0)
@@ -37,28 +37,74 @@ CREATE TABLE IF NOT EXISTS WeatherEmoji (
 
 INSERT INTO Locations (location_name, longitude, latitude)
 VALUES (%s, %s, %s)
+ON CONFLICT (location_name) DO UPDATE
+SET longitude = EXCLUDED.longitude, latitude = EXCLUDED.latitude
 RETURNING location_id;
 
 INSERT INTO Temperature (location_id, day, min_temp_cel, min_temp_fah, max_temp_cel, max_temp_fah)
 VALUES (%s, %s, %s, %s, %s, %s)
+ON CONFLICT (location_id, day) DO UPDATE
+SET min_temp_cel = EXCLUDED.min_temp_cel, min_temp_fah = EXCLUDED.min_temp_fah,
+    max_temp_cel = EXCLUDED.max_temp_cel, max_temp_fah = EXCLUDED.max_temp_fah
 RETURNING temperature_id;
 
-INSERT INTO Hourly (temperature_id, hour, temp_cel, temp_fah, humidity, conditions)
-VALUES (%s, %s, %s, %s, %s, %s)
-RETURNING hourly_id;
+COPY HourlyStage (temperature_id, hour, temp_cel, temp_fah, humidity, conditions)
+FROM STDIN;
 
 INSERT INTO WeatherEmoji (description, icon_code, day_bytes, night_bytes)
 VALUES (%s, %s, %s, %s)
-RETURNING emoji_id;
+ON CONFLICT (icon_code) DO UPDATE
+SET description = EXCLUDED.description, day_bytes = EXCLUDED.day_bytes, night_bytes = EXCLUDED.night_bytes;
 
-SELECT l.location_name, TO_CHAR(t.day, 'MM/DD/YYYY'), h.hour, t.min_temp_fah, t.max_temp_fah, h.temp_fah, h.humidity, h.condition
+CREATE TEMP TABLE IF NOT EXISTS HourlyStage (
+    temperature_id INTEGER,
+    hour TIME,
+    temp_cel DECIMAL(5, 2),
+    temp_fah DECIMAL(5, 2),
+    humidity INTEGER,
+    conditions VARCHAR(255)
+) ON COMMIT DELETE ROWS;
+
+INSERT INTO Hourly (temperature_id, hour, temp_cel, temp_fah, humidity, conditions)
+SELECT DISTINCT ON (temperature_id, hour) temperature_id, hour, temp_cel, temp_fah, humidity, conditions
+FROM HourlyStage
+ORDER BY temperature_id, hour
+ON CONFLICT (temperature_id, hour) DO UPDATE
+SET temp_cel = EXCLUDED.temp_cel, temp_fah = EXCLUDED.temp_fah,
+    humidity = EXCLUDED.humidity, conditions = EXCLUDED.conditions;
+
+DO $$
+BEGIN
+    IF to_regclass('hourly_temperature_hour_key') IS NULL THEN
+        -- Keep the newest copy of every location, day and hour before enforcing natural keys
+        UPDATE Temperature t SET location_id = k.keep_id
+        FROM (SELECT location_id, MAX(location_id) OVER (PARTITION BY location_name) AS keep_id FROM Locations) k
+        WHERE t.location_id = k.location_id AND k.location_id <> k.keep_id;
+        DELETE FROM Locations l USING Locations newer
+        WHERE l.location_name = newer.location_name AND l.location_id < newer.location_id;
+        DELETE FROM Hourly h USING Temperature t, Temperature newer
+        WHERE h.temperature_id = t.temperature_id AND t.location_id = newer.location_id
+            AND t.day = newer.day AND t.temperature_id < newer.temperature_id;
+        DELETE FROM Temperature t USING Temperature newer
+        WHERE t.location_id = newer.location_id AND t.day = newer.day AND t.temperature_id < newer.temperature_id;
+        DELETE FROM Hourly h USING Hourly newer
+        WHERE h.temperature_id = newer.temperature_id AND h.hour = newer.hour AND h.hourly_id < newer.hourly_id;
+        CREATE UNIQUE INDEX IF NOT EXISTS locations_name_key ON Locations (location_name);
+        CREATE UNIQUE INDEX IF NOT EXISTS temperature_location_day_key ON Temperature (location_id, day);
+        CREATE UNIQUE INDEX IF NOT EXISTS hourly_temperature_hour_key ON Hourly (temperature_id, hour);
+    END IF;
+    -- The natural keys lead with these columns, so the single-column indexes are redundant
+    DROP INDEX IF EXISTS temperature_location_id_idx;
+    DROP INDEX IF EXISTS hourly_temperature_id_idx;
+END $$;
+
+CREATE INDEX IF NOT EXISTS temperature_day_idx ON Temperature (day);
+
+CREATE OR REPLACE VIEW WeatherReport AS
+SELECT l.location_id, l.location_name, t.day, h.hour, t.min_temp_fah, t.max_temp_fah, h.temp_fah, h.humidity, h.conditions AS condition
 FROM Locations l
 JOIN Temperature t ON l.location_id = t.location_id
-JOIN (
-    SELECT temperature_id, array_agg(hour) AS hours, array_agg(temp_fah) AS temps_fah,
-    array_agg(humidity) AS humidities, array_agg(conditions) AS conditions
-    FROM Hourly
-    GROUP BY temperature_id
-) h_agg ON t.temperature_id = h_agg.temperature_id
-CROSS JOIN UNNEST(h_agg.hours, h_agg.temps_fah, h_agg.humidities, h_agg.conditions)
-    AS h(hour, temp_fah, humidity, condition);
\ No newline at end of file
+JOIN Hourly h ON t.temperature_id = h.temperature_id;
+
+SELECT r.location_name, TO_CHAR(r.day, 'MM/DD/YYYY'), r.hour, r.min_temp_fah, r.max_temp_fah, r.temp_fah, r.humidity, r.condition
+FROM WeatherReport r;
\ No newline at end of file
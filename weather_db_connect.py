@@ -1,11 +1,16 @@
+import atexit
 import json
+import threading
 from dataclasses import dataclass
 from pathlib import Path
 from typing import NamedTuple
 
 
 import psycopg
-from psycopg import errors
+from psycopg.conninfo import make_conninfo
+from psycopg_pool import ConnectionPool
+
+from icon_store import IconStore
 
 class SQLParams(NamedTuple):
     host: str
@@ -22,6 +27,8 @@ class DBTables:
     itemperature: str
     ihourly: str
     iweatheremoji: str
+    shourly: str
+    mhourly: str
 @dataclass
 class SQLData:
     arg1: str=None
@@ -32,6 +39,44 @@ class SQLData:
     arg6: str=None
 
 
+_pools = {}
+_pools_lock = threading.Lock()
+#**Pools whose database already has the tables, natural keys, indexes and views
+_migrated = set()
+_migrated_lock = threading.Lock()
+
+
+def get_pool(config, max_size=10) -> ConnectionPool:
+    """
+    Return the shared connection pool for a database, creating it on first use.
+
+    Every `ForecastDB`, `DBConnect` and `GroupBy` with the same SQL parameters borrows
+    from the same pool, so repeated queries reuse warm connections.
+
+    Parameters:
+        - `config` (list): `host`, `database`, `user` and `password`, in that order.
+        - `max_size` (int): Maximum number of open connections. Defaults to 10.
+    """
+    config = SQLParams(*config)
+    with _pools_lock:
+        if config not in _pools:
+            conninfo = make_conninfo(host=config.host,
+                                    dbname=config.database,
+                                    user=config.username,
+                                    password=config.password)
+            _pools[config] = ConnectionPool(conninfo, min_size=1, max_size=max_size, open=True)
+        return _pools[config]
+
+
+@atexit.register
+def close_pools():
+    with _pools_lock:
+        while _pools:
+            pool = _pools.popitem()[1]
+            _migrated.discard(pool)
+            pool.close()
+
+
 class ForecastDB:
     def __init__(self, config: list):
         """
@@ -43,132 +88,158 @@ class ForecastDB:
             - `database` (str): The name of the database to connect to.
             - `user` (str): The username to authenticate with.
             - `password` (str): The password for the specified user.
+
+    Nothing is read or connected until `refresh()` is called.
         """
-        self.conditions = ForecastDB.load_json('weather_conditions.json')
-        self.data = ForecastDB.load_json('Forecast_data.json')
+        self.conditions = None
+        self.data = None
+        self.icons = IconStore()
         self.days = 15
         self.config = config
+        self.pool = None
         self.connection = None
         self.cursor = None
-        self.sql_connect(self.config)
-        self.create_tables()
+        self.updated = False
+
+    def refresh(self):
+        """
+        Load `data_files/Forecast_data.json` into the database.
+
+        Connects on first use, creates any missing tables and applies the migrations the
+        first time a pool is used, then upserts the forecast.
+        """
+        self.conditions = ForecastDB.load_json('weather_conditions.json')
+        self.data = ForecastDB.load_json('Forecast_data.json')
+        try:
+            if self.connection is None:
+                self.sql_connect(self.config)
+            self.create_tables()
+        except BaseException:
+            #**Roll back and hand the connection back to the pool before the error propagates
+            self.release()
+            raise
+        self.updated = True
 
     @staticmethod
-    def load_json(file):
-        return json.load(open(Path(__file__).parent.absolute() / file, encoding='utf-8'))
+    def load_json(file, folder='data_files'):
+        return json.load(open(Path(__file__).parent.absolute() / folder / file, encoding='utf-8'))
 
     @staticmethod
     def get_config():
-        return ForecastDB.load_json('config.json')
+        return ForecastDB.load_json('config.json', folder='')
 
     def sql_connect(self, config_):
-        global weather_db
+        global weather_db, migrations
         
         #**All SQL create table scripts
-        weather_db = DBTables(*open(Path(__file__).parent.absolute() / 'weather_db.sql').read().split('\n\n')[:8])
-        config = SQLParams(*config_)
+        sql_script = open(Path(__file__).parent.absolute() / 'weather_db.sql').read().split('\n\n')
+        weather_db = DBTables(*sql_script[:10])
+        #**Natural keys, indexes and views, between the insert statements and the reporting query
+        migrations = sql_script[10:-1]
         
-        try:
-            self.connection = psycopg.connect(
-                host=config.host,
-                dbname=config.database,
-                user=config.username,
-                password=config.password)
-            self.cursor = self.connection.cursor()
-        except (psycopg.Error, FileNotFoundError) as e:
-            raise e
-            print(f"An error occurred during database connection: {e}")
-            self.close_db()
-            raise SystemExit
+        self.pool = get_pool(config_)
+        self.connection = self.pool.getconn()
+        self.cursor = self.connection.cursor()
 
     def create_tables(self):
+        #**The schema DDL takes table locks, so it runs once per pool rather than on every refresh
+        with _migrated_lock:
+            if self.pool not in _migrated:
+                self.cursor.execute(weather_db.clocation)
+                self.connection.commit()
+                
+                self.cursor.execute(weather_db.ctemperature)
+                self.connection.commit()
+                
+                self.cursor.execute(weather_db.chourly)
+                self.connection.commit()
+                
+                self.cursor.execute(weather_db.cweatheremoji)
+                self.connection.commit()
+                
+                for migration in migrations:
+                    self.cursor.execute(migration)
+                self.connection.commit()
+                _migrated.add(self.pool)
         
-        try:
-            self.cursor.execute(weather_db.clocation)
-            self.connection.commit()
-            
-            self.cursor.execute(weather_db.ctemperature)
-            self.connection.commit()
-            
-            self.cursor.execute(weather_db.chourly)
-            self.connection.commit()
-            
-            self.cursor.execute(weather_db.cweatheremoji)
-            self.connection.commit()
-            
-            self.insert_tables()
-            
-        except (psycopg.errors.DuplicateTable, psycopg.errors.NumericValueOutOfRange) as e:
-            raise e
-            print('Table already exists')
+        self.insert_tables()
     
     def insert_tables(self):
-        data = self.data
+        """
+        Load the forecast of one location in a single transaction.
+
+        Every table is upserted on its natural key, so re-running a refresh updates the
+        stored forecast in place instead of adding duplicate rows. Temperature rows are
+        upserted with one `executemany`. Hourly rows are streamed with `COPY` into a staging
+        table and merged in one statement. Each icon is upserted once. There is a single
+        commit at the end.
+        """
+        data = self.data[:self.days]
         conditions = self.conditions
 
         def dataclass_mapper(attr, endpoint):
             return (*map(lambda i: getattr(attr, f'arg{i}'), range(1, endpoint + 1)),)
 
-        # **Executing Locations Table**
-        loca_data = SQLData(arg1=data[0]['location'],
-                            arg2=data[0]['coordinates']['longitude'],
-                            arg3=data[0]['coordinates']['latitude'])
-        location_data = dataclass_mapper(loca_data, 3)
-        self.cursor.execute(weather_db.ilocation, (*location_data,))
-        location_id = self.cursor.fetchone()[0]
-        self.connection.commit()
-        # ** Locations Table Executed**
+        with self.connection.transaction():
+            # **Executing Locations Table**
+            loca_data = SQLData(arg1=data[0]['location'],
+                                arg2=data[0]['coordinates']['longitude'],
+                                arg3=data[0]['coordinates']['latitude'])
+            location_data = dataclass_mapper(loca_data, 3)
+            self.cursor.execute(weather_db.ilocation, (*location_data,))
+            location_id = self.cursor.fetchone()[0]
+            # ** Locations Table Executed**
 
-        
-        for i in range(self.days):
             # **Executing Temperature Table**
-            temp_data = SQLData(arg1=location_id,
-                                arg2=data[i]['day']['date'],
-                                arg3=data[i]['day']['min_temp']['Celcius'],
-                                arg4=data[i]['day']['min_temp']['Fahrenheit'],
-                                arg5=data[i]['day']['max_temp']['Celcius'],
-                                arg6=data[i]['day']['max_temp']['Fahrenheit'])
-            temperature_data = dataclass_mapper(temp_data, 6)
-            self.cursor.execute(weather_db.itemperature, (*temperature_data,))
-            temperature_id = self.cursor.fetchone()[0]
-            self.connection.commit()
+            temperature_records = []
+            for item in data:
+                temp_data = SQLData(arg1=location_id,
+                                    arg2=item['day']['date'],
+                                    arg3=item['day']['min_temp']['Celcius'],
+                                    arg4=item['day']['min_temp']['Fahrenheit'],
+                                    arg5=item['day']['max_temp']['Celcius'],
+                                    arg6=item['day']['max_temp']['Fahrenheit'])
+                temperature_records.append(dataclass_mapper(temp_data, 6))
+            self.cursor.executemany(weather_db.itemperature, temperature_records, returning=True)
+            temperature_ids = []
+            while True:
+                temperature_ids.append(self.cursor.fetchone()[0])
+                if not self.cursor.nextset():
+                    break
             # **Temperature Table Executed**
 
-            try:
-                # **Executing Hourly Table**
-                hour_data = data[i]['day']['hourly_data']
-                hourly_records = []
-                for j in range(24):  # Iterate over 24 hours
-                    hourly = SQLData(
-                        arg1=temperature_id,
-                        arg2=hour_data[j]['hour'],
-                        arg3=hour_data[j]['temperature']['Celcius'],
-                        arg4=hour_data[j]['temperature']['Fahrenheit'],
-                        arg5=hour_data[j]['humidity'],
-                        arg6=hour_data[j]['conditions']
-                    )
-                    hourly_data = dataclass_mapper(hourly, 6)
-                    hourly_records.append(hourly_data)
-
-                self.cursor.executemany(weather_db.ihourly, hourly_records)
-                self.connection.commit()
-                # ** Hourly Table Executed **
-                
-                # **Executing WeatherEmoji Table**
-                for i in self.conditions:
-                    info = SQLData(arg1=conditions[i]['Description'],
-                                    arg2=conditions[i]['Icon Code'],
-                                    arg3=conditions[i]['Day Decoded Bytes'],
-                                    arg4=conditions[i]['Night Decoded Bytes'])
-                    info_data = dataclass_mapper(info, 4)
-                    self.cursor.execute(weather_db.iweatheremoji, (*info_data,))
-                    emoji_id = self.cursor.fetchone()[0]
-                    self.connection.commit()
-
-            except errors.UniqueViolation:
-                self.connection.commit()
+            # **Executing Hourly Table**
+            self.cursor.execute(weather_db.shourly)
+            with self.cursor.copy(weather_db.ihourly) as copy:
+                for temperature_id, item in zip(temperature_ids, data):
+                    for hour_data in item['day']['hourly_data']:
+                        hourly = SQLData(
+                            arg1=temperature_id,
+                            arg2=hour_data['hour'],
+                            arg3=hour_data['temperature']['Celcius'],
+                            arg4=hour_data['temperature']['Fahrenheit'],
+                            arg5=hour_data['humidity'],
+                            arg6=hour_data['conditions']
+                        )
+                        copy.write_row(dataclass_mapper(hourly, 6))
+            self.cursor.execute(weather_db.mhourly)
+            # ** Hourly Table Executed **
 
-    def close_db(self):
+            # **Executing WeatherEmoji Table**
+            emoji_records = {}
+            for i in conditions:
+                info = SQLData(arg1=conditions[i]['Description'],
+                                arg2=conditions[i]['Icon Code'],
+                                arg3=self.icons.get(conditions[i]['Icon Code'], 'day'),
+                                arg4=self.icons.get(conditions[i]['Icon Code'], 'night'))
+                emoji_records.setdefault(info.arg2, dataclass_mapper(info, 4))
+            self.cursor.executemany(weather_db.iweatheremoji, list(emoji_records.values()))
+            # **WeatherEmoji Table Executed**
+
+    def release(self):
+        """
+        Roll back anything uncommitted and return the connection to the pool, silently.
+        """
         if self.connection:
             try:
                 self.connection.rollback()
@@ -177,18 +248,36 @@ class ForecastDB:
                 print(f"An error occurred during transaction rollback: {e}")
         if self.cursor:
             self.cursor.close()
-            print("Database Updated Successfully")
+            self.cursor = None
         if self.connection:
-            self.connection.close()
+            self.pool.putconn(self.connection)
+            self.connection = None
+
+    def close_db(self):
+        connected = self.connection is not None
+        self.release()
+        if self.updated:
+            self.updated = False
+            print("Database Updated Successfully")
+        if connected:
             print("Database Server Closed")
     
-    def __del__(self):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
         self.close_db()
 
+    def __del__(self):
+        try:
+            self.close_db()
+        except (AttributeError, psycopg.Error):
+            pass
 
 def main():
     config = list(ForecastDB.get_config().values())[-4:]
-    weather_db = ForecastDB(config)
+    with ForecastDB(config) as db:
+        db.refresh()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,67 @@
+from datetime import datetime, time
+
+import numpy as np
+import pandas as pd
+
+FEATURE_NAMES = ('humidity', 'seconds', 'day', 'hour_sin', 'hour_cos', 'day_of_year_sin', 'day_of_year_cos')
+SECONDS_PER_DAY = 86_400
+DAYS_PER_YEAR = 365.25
+
+
+def hour_seconds(hour) -> int:
+    """
+    Seconds since midnight of an hour given as a `datetime.time`, 'HH:MM[:SS]' or a whole hour.
+    """
+    if isinstance(hour, time):
+        return hour.hour * 3600 + hour.minute * 60 + hour.second
+    if isinstance(hour, str):
+        return hour_seconds(time.fromisoformat(hour))
+    return int(hour) * 3600
+
+
+def day_value(day) -> np.datetime64:
+    """
+    The calendar day of a 'MM/DD/YYYY' string, a `datetime.date` or a `datetime.datetime`.
+    """
+    if isinstance(day, str):
+        day = datetime.strptime(day, '%m/%d/%Y')
+    if isinstance(day, datetime):
+        day = day.date()
+    return np.datetime64(day, 'D')
+
+
+def build_features(humidity, seconds, days) -> np.ndarray:
+    """
+    Build the model features from whole columns at once.
+
+    Parameters:
+        - `humidity` (array-like): Relative humidity in percent.
+        - `seconds` (array-like): Seconds since midnight.
+        - `days` (array-like): Calendar days, as `datetime64[D]`.
+
+    Returns:
+        - `np.ndarray`: A float32 array of shape (rows, len(FEATURE_NAMES)). The day is kept
+        as epoch seconds, and hour and day of year are also encoded on the unit circle.
+    """
+    humidity = np.asarray(humidity, dtype=np.float64)
+    seconds = np.asarray(seconds, dtype=np.float64)
+    days = np.asarray(days, dtype='datetime64[D]')
+    epoch = days.astype('datetime64[s]').astype(np.int64)
+    day_of_year = (days - days.astype('datetime64[Y]')).astype(np.int64)
+    hour_angle = 2 * np.pi * seconds / SECONDS_PER_DAY
+    year_angle = 2 * np.pi * day_of_year / DAYS_PER_YEAR
+    return np.column_stack((humidity, seconds, epoch,
+                            np.sin(hour_angle), np.cos(hour_angle),
+                            np.sin(year_angle), np.cos(year_angle))).astype(np.float32)
+
+
+def frame_features(data: pd.DataFrame) -> np.ndarray:
+    """
+    Build the model features of the rows of the reporting query.
+
+    Seconds are read from the `datetime.time` components of `hour`, and `day` is parsed
+    once for the whole column.
+    """
+    seconds = np.fromiter(map(hour_seconds, data['hour']), dtype=np.int64, count=len(data))
+    days = pd.to_datetime(data['day'], format='%m/%d/%Y').to_numpy(dtype='datetime64[D]')
+    return build_features(data['humidity'].to_numpy(), seconds, days)
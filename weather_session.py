@@ -0,0 +1,125 @@
+import threading
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+@dataclass
+class RetryPolicy:
+    retries: int = 4
+    backoff: float = 0.5
+    max_backoff: float = 30.0
+    statuses: frozenset = RETRY_STATUSES
+
+
+class WeatherSession:
+    def __init__(self, pool_size=10, host_limit=4, timeout=15, policy=None):
+        """
+        Shared HTTP transport for every API client.
+
+        Connections are kept alive in a pool per host, so repeated calls to the same
+        API skip the TCP/TLS handshake. Retryable responses (429 and 5xx) are retried with
+        bounded exponential backoff, honoring the `Retry-After` header when the server sends one.
+
+        Parameters:
+            - `pool_size` (int): Number of keep-alive connections kept per host.
+            - `host_limit` (int): Maximum number of requests in flight per host.
+            - `timeout` (float): Timeout in seconds for each request.
+            - `policy` (RetryPolicy, optional): Retry settings. Defaults to `RetryPolicy()`.
+        """
+        self.policy = policy or RetryPolicy()
+        self.timeout = timeout
+        self.host_limit = host_limit
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._limits = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def _limiter(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._limits:
+                self._limits[host] = threading.BoundedSemaphore(self.host_limit)
+            return self._limits[host]
+
+    def retry_delay(self, response, attempt):
+        """
+        Compute how long to wait before the next attempt.
+
+        Parameters:
+            - `response` (requests.Response | None): The failed response, if any.
+            - `attempt` (int): Zero-based number of the attempt that failed.
+
+        Returns:
+            - `float`: The delay in seconds, never more than `policy.max_backoff`.
+        """
+        delay = self.policy.backoff * 2 ** attempt
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after:
+            try:
+                delay = float(retry_after)
+            except ValueError:
+                try:
+                    delay = parsedate_to_datetime(retry_after).timestamp() - time.time()
+                except (TypeError, ValueError):
+                    pass
+        return min(max(delay, 0.0), self.policy.max_backoff)
+
+    def get(self, url, params=None, **kwargs):
+        """
+        Send a GET request through the pooled session.
+
+        Parameters:
+            - `url` (str): The URL to request.
+            - `params` (dict, optional): Query string parameters.
+
+        Returns:
+            - `requests.Response`: The last response received. Once retries are exhausted,
+            a retryable status is returned as-is so callers can `raise_for_status()`.
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        for attempt in range(self.policy.retries + 1):
+            response = None
+            try:
+                with self._limiter(url):
+                    response = self.session.get(url, params=params, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.policy.retries:
+                    raise
+            else:
+                if response.status_code not in self.policy.statuses or attempt == self.policy.retries:
+                    return response
+                response.close()
+            time.sleep(self.retry_delay(response, attempt))
+
+    def close(self):
+        self.session.close()
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """
+    Return the process-wide `WeatherSession`, creating it on first use.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = WeatherSession()
+        return _session